@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache
+from history import REPORT_PERIOD_DAYS
+
+# Replenishment alerts over the two QWTT Inward tables. Each row's stock is
+# compared with the demand seen in the business reports over the period they
+# cover:
+#   table -> (stock column, sales column, identifier columns shown)
+ALERT_SPECS = {
+    "flipkart_qwtt_inward": (
+        "Flipkart QWTT Stock", "Total Orders", ["(Parent) ASIN", "FNS"]
+    ),
+    "amazon_qwtt_inward": (
+        "Amazon Stock", "Final Sale Units", ["Product Id", "Amazon ASIN"]
+    ),
+}
+
+# Days of cover below each bound, most urgent first; rows without sales are
+# "No sales" whatever their stock.
+URGENCY_BANDS = [
+    (0, "Out of stock"),
+    (7, "Critical"),
+    (15, "Low"),
+    (30, "Watch"),
+    (np.inf, "OK"),
+]
+URGENCY_LEVELS = [label for _, label in URGENCY_BANDS] + ["No sales"]
+
+# The business reports' window, as assumed when their sales are stored
+SALES_PERIOD_DAYS = REPORT_PERIOD_DAYS
+TARGET_COVER_DAYS = 30
+
+# Alert tables per (data fingerprint, table, period, target)
+alerts_cache = LRUCache(max_entries=16, max_bytes=512 * 1024 ** 2)
+
+
+def build_alerts(inward, table, period_days=SALES_PERIOD_DAYS, target_days=TARGET_COVER_DAYS):
+    """Days-of-cover, urgency and reorder figures for every row of an inward table.
+
+    Velocity is sales / ``period_days``; days of cover is stock / velocity
+    (infinite without sales). Reorder Qty tops stock up to ``target_days``
+    of cover and Reorder CP prices it at CP. The result is sorted by days
+    of cover (then by Reorder CP, largest first) so threshold filters are a
+    prefix slice, see within_cover().
+    """
+    stock_column, sales_column, id_columns = ALERT_SPECS[table]
+    stock = inward[stock_column].to_numpy(dtype="float64")
+    sales = pd.to_numeric(inward[sales_column]).to_numpy(dtype="float64", na_value=0.0)
+    cp = pd.to_numeric(inward["CP"]).to_numpy(dtype="float64", na_value=0.0)
+
+    velocity = np.clip(sales, 0, None) / period_days
+    selling = velocity > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(selling, np.clip(stock, 0, None) / velocity, np.inf)
+
+    bounds = np.array([bound for bound, _ in URGENCY_BANDS[1:]])
+    band = np.where(stock <= 0, 0, np.searchsorted(bounds, cover, side="right") + 1)
+    band = np.where(selling, np.minimum(band, len(URGENCY_BANDS) - 1), len(URGENCY_BANDS))
+
+    reorder = np.where(selling, np.ceil(np.clip(velocity * target_days - stock, 0, None)), 0.0)
+
+    alerts = inward[
+        id_columns + ["Brand", "Brand Manager", "Product Name", "EasycomSKU"]
+    ].reset_index(drop=True)
+    alerts["CP"] = cp
+    alerts[sales_column] = sales
+    alerts[stock_column] = stock
+    alerts["Daily Velocity"] = velocity.round(3)
+    alerts["Days of Cover"] = cover.round(1)
+    alerts["Urgency"] = pd.Categorical.from_codes(band, categories=URGENCY_LEVELS, ordered=True)
+    alerts["Reorder Qty"] = reorder.astype("int64")
+    alerts["Reorder CP"] = reorder * cp
+    alerts["Daily CP At Risk"] = np.where(cover < target_days, velocity * cp, 0.0)
+
+    order = np.lexsort((-alerts["Reorder CP"].to_numpy(), cover))
+    alerts = alerts.iloc[order].reset_index(drop=True)
+    alerts.insert(0, "Rank", np.arange(1, len(alerts) + 1))
+    return alerts
+
+
+def cached_alerts(fingerprint, results, table, period_days=SALES_PERIOD_DAYS, target_days=TARGET_COVER_DAYS):
+    """build_alerts() for a results set, computed once per data fingerprint
+    and settings. The returned frame is shared and must not be mutated."""
+    return alerts_cache.get_or_create(
+        (fingerprint, table, period_days, target_days),
+        lambda: build_alerts(results[table], table, period_days, target_days)
+    )
+
+
+def within_cover(alerts, max_days):
+    """Rows with at most ``max_days`` of cover (a slice; no row scan)."""
+    end = np.searchsorted(alerts["Days of Cover"].to_numpy(), max_days, side="right")
+    return alerts.iloc[:end]
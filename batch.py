@@ -0,0 +1,338 @@
+import argparse
+import io
+import multiprocessing
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from cache import LRUCache
+from export import EXPORT_FORMATS
+from loaders import EXCEL_ENGINES, LOAD_WORKERS, content_hash, load_reports, resolve_excel_engine
+from pipeline import INPUTS, OUTPUT_TABLES, RESULTS_TTL, build_tables, write_tables
+from profiling import Profiler, stage
+from schemas import SCHEMAS, SchemaError
+
+# Batch mode: several seller accounts, each with its own five reports, share
+# one Amazon PM and one Flipkart PM. Accounts are built in worker processes.
+SHARED_INPUTS = ["amazon_pm", "flipkart_pm"]
+ACCOUNT_INPUTS = [kind for kind in INPUTS if kind not in SHARED_INPUTS]
+
+# Tables returned per account and combined across accounts
+BATCH_TABLES = list(OUTPUT_TABLES) + ["flipkart_qwtt_inward_filter", "amazon_qwtt_inward_filter"]
+TRUTHS = [
+    "amazon_total_orders_truth",
+    "amazon_total_products_truth",
+    "flipkart_total_sale_units_truth",
+    "flipkart_total_products_truth",
+]
+
+# File name words that identify each report inside an account's zip/folder,
+# checked in order (e.g. "Flipkart Easycom Inventory.csv", "amazon_stock.csv").
+# Channel words come first: a bare "BusinessReport" is Amazon's export name,
+# but "BusinessReport-Flipkart.xlsx" is Flipkart's
+FILE_KEYWORDS = [
+    ("flipkart_inventory", {"easycom"}),
+    ("flipkart_inventory", {"flipkart", "inventory"}),
+    ("qwtt_inventory", {"qwtt"}),
+    ("amazon_stock", {"amazon", "stock"}),
+    ("flipkart_business", {"flipkart", "business"}),
+    ("flipkart_business", {"flipkart", "businessreport"}),
+    ("amazon_business", {"amazon", "business"}),
+    ("amazon_business", {"businessreport"}),
+    ("amazon_pm", {"amazon", "pm"}),
+    ("flipkart_pm", {"flipkart", "pm"}),
+]
+# File types each report is read from (as in the dashboard's uploaders)
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+REPORT_EXTENSIONS = {
+    "qwtt_inventory": (".csv",) + EXCEL_EXTENSIONS,
+    "amazon_stock": (".csv",),
+    "flipkart_business": EXCEL_EXTENSIONS,
+    "amazon_business": (".csv",) + EXCEL_EXTENSIONS,
+    "amazon_pm": EXCEL_EXTENSIONS,
+    "flipkart_pm": EXCEL_EXTENSIONS,
+    "flipkart_inventory": (".csv",),
+}
+
+# Finished batches, keyed on every input's content hash
+batch_cache = LRUCache(max_entries=4, max_bytes=2 * 1024 ** 3, ttl=RESULTS_TTL)
+
+
+class AccountError(ValueError):
+    """An account's file set cannot be matched to the expected reports."""
+
+
+# =============================
+# ACCOUNT FILE SETS
+# =============================
+
+def classify(filename):
+    """Report kind a file name looks like, or None.
+
+    Raises AccountError for a report saved in a file type it is not read
+    from (e.g. an Amazon Stock .xlsx), rather than failing at parse time.
+    """
+    name = os.path.basename(filename)
+    stem, ext = os.path.splitext(name.lower())
+    if ext not in (".csv",) + EXCEL_EXTENSIONS:
+        return None
+    words = set(re.split(r"[^a-z0-9]+", stem))
+    for kind, keywords in FILE_KEYWORDS:
+        if keywords <= words:
+            if ext not in REPORT_EXTENSIONS[kind]:
+                raise AccountError(
+                    f"{name} looks like the {SCHEMAS[kind]['label']}, which must be "
+                    f"{' or '.join(REPORT_EXTENSIONS[kind])}, not {ext}"
+                )
+            return kind
+    return None
+
+
+def _add_source(sources, filename, read):
+    kind = classify(filename)
+    if kind is None or kind in SHARED_INPUTS:
+        return
+    name = os.path.basename(filename)
+    if kind in sources:
+        raise AccountError(
+            f"both {sources[kind][1]} and {name} look like the {SCHEMAS[kind]['label']}"
+        )
+    sources[kind] = (read(), name)
+
+
+def read_zip(data):
+    """{kind: (data, name)} for the reports in a zip archive."""
+    sources = {}
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            base = os.path.basename(info.filename)
+            if info.is_dir() or base.startswith(".") or "__MACOSX" in info.filename:
+                continue
+            _add_source(sources, info.filename, lambda: archive.read(info))
+    return sources
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def read_folder(path):
+    """{kind: (data, name)} for the reports in a folder (not recursive)."""
+    sources = {}
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        if os.path.isfile(full) and not name.startswith("."):
+            _add_source(sources, name, lambda: _read_file(full))
+    return sources
+
+
+def read_account(path):
+    """Report sources of one account given as a folder or a zip file."""
+    if os.path.isdir(path):
+        return read_folder(path)
+    return read_zip(_read_file(path))
+
+
+def account_name(filename, taken=()):
+    name = os.path.splitext(os.path.basename(os.path.normpath(filename)))[0]
+    unique, n = name, 2
+    while unique in taken:
+        unique, n = f"{name} ({n})", n + 1
+    return unique
+
+
+# =============================
+# BUILD
+# =============================
+
+_shared_pms = None
+
+
+def _init_worker(pms):
+    global _shared_pms
+    _shared_pms = pms
+
+
+def build_account(sources, pms, engine=None):
+    """The dashboard tables for one account's reports plus the shared PMs."""
+    frames = load_reports(sources, engine=engine, workers=1, use_cache=False, use_index=False)
+    frames.update(pms)
+    results = build_tables(frames)
+    return {key: results[key] for key in BATCH_TABLES + TRUTHS}
+
+
+def _build_in_worker(sources, engine):
+    return build_account(sources, _shared_pms, engine)
+
+
+def _account_error(e):
+    # Schema errors already read as a message; anything else (a corrupt
+    # workbook, an unreadable CSV) is named so the account can be fixed
+    return str(e) if isinstance(e, SchemaError) else f"could not read a report ({type(e).__name__}: {e})"
+
+
+def combine(accounts):
+    """Stack every account's tables with a leading Account column and sum
+    the report totals."""
+    combined = {}
+    for key in BATCH_TABLES:
+        parts = []
+        for account, results in accounts.items():
+            part = results[key].reset_index(drop=True)
+            part.insert(0, "Account", account)
+            parts.append(part)
+        table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["Account"])
+        table["Account"] = pd.Categorical(table["Account"], categories=list(accounts))
+        combined[key] = table
+    for key in TRUTHS:
+        combined[key] = sum(results[key] for results in accounts.values())
+    return combined
+
+
+def _batch_key(accounts, pm_sources, engine):
+    return (
+        resolve_excel_engine(engine),
+        tuple(
+            (account, kind, content_hash(data))
+            for account, sources in accounts.items()
+            for kind, (data, _) in sorted(sources.items())
+        ),
+        tuple((kind, content_hash(data)) for kind, (data, _) in sorted(pm_sources.items())),
+    )
+
+
+def run_batch(accounts, pm_sources, engine=None, workers=None, profiler=None, use_cache=True):
+    """Build the tables for several accounts against one pair of PMs.
+
+    ``accounts`` maps account name to ``{kind: (data, name)}`` for its five
+    reports; ``pm_sources`` holds the shared Amazon / Flipkart PM the same
+    way. The PMs are loaded once and handed to each worker process.
+
+    Returns ``{"accounts": {name: tables}, "combined": tables, "errors":
+    {name: message}, "key": inputs key or None}``; an account with missing
+    or invalid reports is reported in ``errors`` instead of failing the
+    batch.
+    """
+    key = _batch_key(accounts, pm_sources, engine) if use_cache else None
+    if key is not None:
+        cached = batch_cache.get(key)
+        if cached is not None:
+            return cached
+
+    with stage(profiler, "load:pm"):
+        pms = load_reports(pm_sources, engine=engine, workers=1)
+
+    errors = {}
+    pending = {}
+    for account, sources in accounts.items():
+        missing = [SCHEMAS[kind]["label"] for kind in ACCOUNT_INPUTS if kind not in sources]
+        if missing:
+            errors[account] = f"missing {', '.join(missing)}"
+        else:
+            pending[account] = {kind: sources[kind] for kind in ACCOUNT_INPUTS}
+
+    workers = min(LOAD_WORKERS if workers is None else workers, len(pending))
+    built = {}
+    with stage(profiler, "accounts") as info:
+        if workers > 1:
+            # spawn, not fork: the Streamlit server process is multi-threaded
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(pms,)
+            ) as executor:
+                futures = {
+                    account: executor.submit(_build_in_worker, sources, engine)
+                    for account, sources in pending.items()
+                }
+                for account, future in futures.items():
+                    try:
+                        built[account] = future.result()
+                    except Exception as e:  # one bad account must not fail the batch
+                        errors[account] = _account_error(e)
+        else:
+            for account, sources in pending.items():
+                try:
+                    built[account] = build_account(sources, pms, engine)
+                except Exception as e:  # one bad account must not fail the batch
+                    errors[account] = _account_error(e)
+        info["rows"] = len(built)
+
+    with stage(profiler, "combine"):
+        batch = {"accounts": built, "combined": combine(built), "errors": errors, "key": key}
+    if key is not None:
+        batch_cache.put(key, batch)
+    return batch
+
+
+# =============================
+# COMMAND LINE
+# =============================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the stock movement tables for several accounts sharing one pair of PMs."
+    )
+    parser.add_argument("accounts", nargs="+", metavar="ACCOUNT",
+                        help="Zip or folder of one account's five reports; "
+                             "NAME=PATH names the account, otherwise the file/folder name is used")
+    parser.add_argument("--amazon-pm", required=True, metavar="PATH")
+    parser.add_argument("--flipkart-pm", required=True, metavar="PATH")
+    parser.add_argument("-o", "--output-dir", required=True,
+                        help="Gets a combined/ folder and one folder per account")
+    parser.add_argument("--format", choices=[ext for ext, _ in EXPORT_FORMATS.values()], default="xlsx")
+    parser.add_argument("--excel-engine", choices=EXCEL_ENGINES, default=None,
+                        help="Excel reader (default: STOCK_MOVEMENT_EXCEL_ENGINE or auto)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Accounts built concurrently (1 = sequential)")
+    parser.add_argument("--timings", action="store_true", help="Print per-stage time and memory to stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    accounts = {}
+    try:
+        for spec in args.accounts:
+            name, sep, path = spec.partition("=")
+            if not sep:
+                name, path = account_name(spec, accounts), spec
+            accounts[name] = read_account(path)
+    except (AccountError, zipfile.BadZipFile) as e:
+        print(f"error: {spec}: {e}", file=sys.stderr)
+        return 2
+
+    pm_sources = {}
+    for kind, path in [("amazon_pm", args.amazon_pm), ("flipkart_pm", args.flipkart_pm)]:
+        with open(path, "rb") as f:
+            pm_sources[kind] = (f.read(), os.path.basename(path))
+
+    profiler = Profiler()
+    try:
+        batch = run_batch(accounts, pm_sources, args.excel_engine, args.workers, profiler, use_cache=False)
+    except SchemaError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    fmt = next(name for name, (ext, _) in EXPORT_FORMATS.items() if ext == args.format)
+    with stage(profiler, "write"):
+        for path in write_tables(batch["combined"], os.path.join(args.output_dir, "combined"), fmt):
+            print(path)
+        for account, results in batch["accounts"].items():
+            for path in write_tables(results, os.path.join(args.output_dir, account), fmt):
+                print(path)
+
+    for account, message in batch["errors"].items():
+        print(f"error: {account}: {message}", file=sys.stderr)
+    if args.timings:
+        print(profiler.to_frame().to_string(index=False), file=sys.stderr)
+    return 1 if batch["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Benchmark: QWTT Inward builders, per-column groupby/map passes vs one aggregation.
+
+    python benchmarks/bench_inward.py [--skus 500000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pipeline import build_amazon_qwtt_inward, build_flipkart_qwtt_inward  # noqa: E402
+
+
+def legacy_flipkart_qwtt_inward(amazon_business_pivot, Flipkart_Business_Pivot):
+    flipkart_qwtt_inward = amazon_business_pivot.copy()
+    flipkart_sales_map = Flipkart_Business_Pivot.groupby("EasycomSKU")["Final Sale Units"].sum()
+    flipkart_qwtt_inward["Flipkart Sales"] = (
+        flipkart_qwtt_inward["EasycomSKU"].map(flipkart_sales_map).fillna(0).astype(int)
+    )
+    flipkart_stock_map = Flipkart_Business_Pivot.groupby("EasycomSKU")["QWTT Stock"].sum()
+    flipkart_qwtt_inward["Flipkart QWTT Stock"] = (
+        flipkart_qwtt_inward["EasycomSKU"].map(flipkart_stock_map).fillna(0).astype(int)
+    )
+    flipkart_fns_map = Flipkart_Business_Pivot.groupby("EasycomSKU")["FNS"].first()
+    flipkart_qwtt_inward["FNS"] = flipkart_qwtt_inward["EasycomSKU"].map(flipkart_fns_map)
+    return flipkart_qwtt_inward
+
+
+def legacy_amazon_qwtt_inward(Flipkart_Business_Pivot, amazon_business_pivot):
+    amazon_qwtt_inward = Flipkart_Business_Pivot.copy()
+    amazon_sales_map = amazon_business_pivot.groupby("EasycomSKU")["Total Orders"].sum()
+    amazon_qwtt_inward["Amazon Sales"] = (
+        amazon_qwtt_inward["EasycomSKU"].map(amazon_sales_map).fillna(0).astype(int)
+    )
+    amazon_stock_map = amazon_business_pivot.groupby("EasycomSKU")["QWTT Stock"].sum()
+    amazon_qwtt_inward["Amazon Stock"] = (
+        amazon_qwtt_inward["EasycomSKU"].map(amazon_stock_map).fillna(0).astype(int)
+    )
+    amazon_asin_map = amazon_business_pivot.groupby("EasycomSKU")["(Parent) ASIN"].first()
+    amazon_qwtt_inward["Amazon ASIN"] = amazon_qwtt_inward["EasycomSKU"].map(amazon_asin_map)
+    return amazon_qwtt_inward
+
+
+def make_pivots(skus, seed=0):
+    """Amazon/Flipkart business pivots over a catalog of ``skus`` EasycomSKUs,
+    with ~1.5 listings per SKU per channel and 10% unmapped listings."""
+    rng = np.random.default_rng(seed)
+    catalog = np.array([f"SKU{i:07d}" for i in range(skus)], dtype=object)
+
+    def listings(prefix, n):
+        sku = catalog[rng.integers(0, skus, n)]
+        sku[rng.random(n) < 0.1] = pd.NA
+        return pd.DataFrame({
+            prefix: [f"{prefix[:3]}{i:08d}" for i in range(n)],
+            "EasycomSKU": sku,
+            "qty": rng.integers(0, 500, n),
+            "QWTT Stock": rng.integers(0, 200, n).astype(float),
+            "CP": rng.integers(50, 5000, n).astype(float),
+        })
+
+    n = int(skus * 1.5)
+    amazon = listings("(Parent) ASIN", n).rename(columns={"qty": "Total Orders"})
+    flipkart = listings("Product Id", n).rename(columns={"qty": "Final Sale Units"})
+    flipkart["FNS"] = flipkart["Product Id"]
+    return amazon, flipkart
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, nargs="+", default=[50_000, 200_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'skus':>9} {'side':<9} {'legacy':>9} {'single agg':>11} {'speedup':>8}")
+    for skus in args.skus:
+        amazon, flipkart = make_pivots(skus)
+        for side, legacy, current, inputs in [
+            ("flipkart", legacy_flipkart_qwtt_inward, build_flipkart_qwtt_inward, (amazon, flipkart)),
+            ("amazon", legacy_amazon_qwtt_inward, build_amazon_qwtt_inward, (flipkart, amazon)),
+        ]:
+            expected, legacy_seconds = timed(legacy, *inputs)
+            result, seconds = timed(current, *inputs)
+            pd.testing.assert_frame_equal(expected, result, check_dtype=False)
+            print(f"{skus:>9,} {side:<9} {legacy_seconds:8.3f}s {seconds:10.3f}s {legacy_seconds / seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
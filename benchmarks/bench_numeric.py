@@ -0,0 +1,76 @@
+"""Micro-benchmark: report number cleaning, legacy chain vs cleaning.coerce_numeric.
+
+    python benchmarks/bench_numeric.py [--rows 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cleaning import CURRENCY, coerce_numeric  # noqa: E402
+
+
+def legacy_clean(series):
+    series = (
+        series
+        .astype(str)
+        .str.replace("₹", "", regex=False)
+        .str.replace(",", "", regex=False)
+        .str.replace("--", "", regex=False)
+        .str.strip()
+    )
+    return pd.to_numeric(series, errors="coerce").fillna(0)
+
+
+def make_column(rows, dirty_share, seed=0):
+    """Object column shaped like an Excel export: mostly plain numbers, some
+    comma/currency formatted strings and blanks."""
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(0, 50_000, rows)
+    values = numbers.astype(object)
+    dirty = rng.random(rows) < dirty_share
+    values[dirty] = [f"₹{n:,}" for n in numbers[dirty]]
+    values[rng.random(rows) < 0.01] = "--"
+    values[rng.random(rows) < 0.01] = None
+    return pd.Series(values, dtype=object)
+
+
+def best_of(func, series, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(series)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'column':<28} {'legacy':>10} {'coerce':>10} {'speedup':>8}")
+    for label, share in [("numeric dtype", None), ("mixed, 5% formatted", 0.05),
+                         ("mixed, 50% formatted", 0.5), ("all strings", 1.0),
+                         ("all strings, str dtype (CSV)", "str")]:
+        if share is None:
+            series = pd.Series(np.arange(args.rows, dtype="int64"))
+        elif share == "str":
+            series = make_column(args.rows, 1.0).astype("str")
+        else:
+            series = make_column(args.rows, share)
+        assert np.allclose(legacy_clean(series), coerce_numeric(series, remove=CURRENCY))
+
+        legacy = best_of(legacy_clean, series, args.repeat)
+        fast = best_of(lambda s: coerce_numeric(s, remove=CURRENCY), series, args.repeat)
+        print(f"{label:<28} {legacy:9.3f}s {fast:9.3f}s {legacy / fast:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
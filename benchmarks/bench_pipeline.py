@@ -0,0 +1,85 @@
+"""Benchmark: the full pipeline on synthetic reports, per stage, at several sizes.
+
+Each size runs ``pipeline.py`` in a fresh process (with an empty PM index)
+so peak memory belongs to that run alone.
+
+    python benchmarks/bench_pipeline.py [--rows 10000 100000 1000000 2000000] [--json results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import generate_inputs, write_inputs  # noqa: E402
+
+
+def run_pipeline(paths, workdir, workers, engine=None):
+    """Run the CLI on ``paths`` and return its profile as a dict."""
+    profile = os.path.join(workdir, "profile.json")
+    command = [sys.executable, os.path.join(ROOT, "pipeline.py"),
+               "-o", os.path.join(workdir, "out"), "--format", "csv",
+               "--workers", str(workers), "--profile-json", profile]
+    for kind, path in paths.items():
+        command += [f"--{kind.replace('_', '-')}", path]
+    if engine:
+        command += ["--excel-engine", engine]
+    env = dict(os.environ, STOCK_MOVEMENT_INDEX_DIR=os.path.join(workdir, "pm_index"))
+    subprocess.run(command, check=True, env=env, stdout=subprocess.DEVNULL)
+    with open(profile) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 2_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Load workers (1 keeps parsing in-process so memory is attributed to it)")
+    parser.add_argument("--excel", action="store_true", help="Also write QWTT Inventory and Amazon Business as .xlsx")
+    parser.add_argument("--excel-engine", default=None)
+    parser.add_argument("--json", default=None, metavar="PATH", help="Also write all results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory(prefix="stock_movement_bench_") as workdir:
+            start = time.perf_counter()
+            paths = write_inputs(generate_inputs(rows, args.seed), os.path.join(workdir, "inputs"), args.excel)
+            generate_seconds = time.perf_counter() - start
+            input_bytes = sum(os.path.getsize(p) for p in paths.values())
+            profile = run_pipeline(paths, workdir, args.workers, args.excel_engine)
+
+        profile.update(rows=rows, input_mb=round(input_bytes / 1024 ** 2, 1))
+        results.append(profile)
+        table = pd.DataFrame(profile["stages"])
+        print(f"\n{rows:,} rows ({profile['input_mb']} MB of input, generated in {generate_seconds:.1f}s)")
+        print(table.to_string(index=False))
+        print(f"total {profile['total_seconds']:.2f}s, "
+              f"peak RSS {profile['peak_rss_mb']:.0f} MB")
+
+    summary = pd.DataFrame([
+        {
+            "rows": r["rows"],
+            "input_mb": r["input_mb"],
+            "seconds": r["total_seconds"],
+            "peak_rss_mb": r["peak_rss_mb"],
+        }
+        for r in results
+    ])
+    print("\n" + summary.to_string(index=False))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
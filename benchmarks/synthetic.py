@@ -0,0 +1,152 @@
+"""Synthetic versions of the seven input reports, for benchmarks.
+
+The frames mimic the quirks of the real exports: duplicate ASIN / FNS rows
+in the product masters, mixed-case ASINs, a padded ``FNS `` header,
+comma-formatted quantities, ``₹`` prices with ``--`` placeholders,
+negative Flipkart sale units and backtick-prefixed Easycom SKUs.
+
+    python benchmarks/synthetic.py --rows 100000 -o /tmp/synthetic
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from export import to_excel_bytes  # noqa: E402
+
+# Excel sheets hold at most 1,048,576 rows including the header
+EXCEL_MAX_ROWS = 1_048_575
+
+# The product masters and Flipkart Business Report are only accepted as
+# workbooks; QWTT Inventory and the Amazon Business Report may be either
+EXCEL_ONLY = {"flipkart_business", "amazon_pm", "flipkart_pm"}
+EITHER = {"qwtt_inventory", "amazon_business"}
+
+BRANDS = [f"Brand {i:02d}" for i in range(40)]
+BRAND_MANAGERS = [f"Manager {i}" for i in range(8)]
+
+
+def _ids(prefix, n, width):
+    return pd.Series(np.arange(n)).map(f"{prefix}{{:0{width}d}}".format).to_numpy(dtype=object)
+
+
+def _with_commas(values):
+    return pd.Series(values).map("{:,}".format).to_numpy(dtype=object)
+
+
+def generate_inputs(rows, seed=0):
+    """All seven reports as raw (uncleaned) frames, keyed like ``pipeline.INPUTS``.
+
+    ``rows`` is the length of the per-listing reports (stock, business and
+    inventory files; the Flipkart Business Report is capped at one sheet);
+    the product masters cover a catalog of about a quarter as many
+    products, with ~10% duplicate rows.
+    """
+    rng = np.random.default_rng(seed)
+    products = max(rows // 4, 10)
+    asins = _ids("B0", products, 8)
+    fns = _ids("FNS", products, 9)
+    skus = _ids("SKU", max(products * 3 // 4, 10), 8)
+
+    def pick(values, n):
+        return values[rng.integers(0, len(values), n)]
+
+    def product_master(key, keys, plain_prices):
+        n = len(keys) + len(keys) // 10
+        pm_keys = np.concatenate([keys, pick(keys, n - len(keys))])
+        rng.shuffle(pm_keys)
+        sku = pick(skus, n)
+        sku[rng.random(n) < 0.05] = None
+        cp = rng.integers(50, 25_000, n)
+        cp_text = np.array([f"₹{v:,}" for v in cp], dtype=object)
+        plain = rng.random(n) < plain_prices
+        cp_text[plain] = cp[plain]
+        cp_text[rng.random(n) < 0.02] = "--"
+        return pd.DataFrame({
+            key: pm_keys,
+            "Brand": pick(np.array(BRANDS, dtype=object), n),
+            "Brand Manager": pick(np.array(BRAND_MANAGERS, dtype=object), n),
+            "Product Name": pd.Series(sku).fillna("Unlisted").to_numpy() + " product",
+            "Vendor SKU Codes": pick(skus, n),
+            "EasycomSKU": sku,
+            "CP": cp_text,
+        })
+
+    amazon_pm = product_master("ASIN", asins, plain_prices=0.3)
+    lower = rng.random(len(amazon_pm)) < 0.05
+    amazon_pm.loc[lower, "ASIN"] = amazon_pm.loc[lower, "ASIN"].str.lower()
+
+    # Flipkart PM prices are usually plain numbers
+    flipkart_pm = product_master("FNS", fns, plain_prices=0.8).rename(columns={"FNS": "FNS "})
+
+    return {
+        "qwtt_inventory": pd.DataFrame({
+            "Asin": pick(asins, rows),
+            "Warehouse": pick(np.array(["DEL", "BOM", "BLR"], dtype=object), rows),
+            "Sellable": _with_commas(rng.integers(0, 5_000, rows)),
+        }),
+        "amazon_stock": pd.DataFrame({
+            "sku": pick(skus, rows),
+            "asin": pick(asins, rows),
+            "afn-warehouse-quantity": rng.integers(0, 300, rows),
+        }),
+        "flipkart_business": pd.DataFrame({
+            "Product Id": pick(fns, min(rows, EXCEL_MAX_ROWS)),
+            "Final Sale Units": rng.integers(-5, 60, min(rows, EXCEL_MAX_ROWS)),
+            "Final Sale Amount": rng.integers(0, 100_000, min(rows, EXCEL_MAX_ROWS)),
+        }),
+        "amazon_business": pd.DataFrame({
+            "(Parent) ASIN": pick(asins, rows),
+            "Total Order Items": _with_commas(rng.integers(0, 3_000, rows)),
+            "Total Order Items - B2B": rng.integers(0, 20, rows),
+        }),
+        "amazon_pm": amazon_pm,
+        "flipkart_pm": flipkart_pm,
+        "flipkart_inventory": pd.DataFrame({
+            "sku": "`" + pd.Series(pick(skus, rows)),
+            "old_quantity": rng.integers(0, 400, rows),
+        }),
+    }
+
+
+def write_inputs(frames, directory, excel=False):
+    """Write the reports to ``directory`` and return {kind: path}.
+
+    Reports the app only accepts as workbooks are always .xlsx. With
+    ``excel`` set, QWTT Inventory and the Amazon Business Report are too,
+    where they fit in a sheet; everything else is CSV.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for kind, df in frames.items():
+        stem = os.path.join(directory, kind)
+        workbook = kind in EXCEL_ONLY or (excel and kind in EITHER)
+        if workbook and len(df) <= EXCEL_MAX_ROWS:
+            paths[kind] = f"{stem}.xlsx"
+            with open(paths[kind], "wb") as f:
+                f.write(to_excel_bytes(df))
+        else:
+            paths[kind] = f"{stem}.csv"
+            df.to_csv(paths[kind], index=False)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--excel", action="store_true", help="Also write QWTT Inventory and Amazon Business as .xlsx")
+    parser.add_argument("-o", "--output-dir", required=True)
+    args = parser.parse_args()
+
+    paths = write_inputs(generate_inputs(args.rows, args.seed), args.output_dir, args.excel)
+    for kind, path in paths.items():
+        print(f"--{kind.replace('_', '-')} {path}")
+
+
+if __name__ == "__main__":
+    main()
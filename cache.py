@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def frame_nbytes(value):
+    """Approximate in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(frame_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(frame_nbytes(v) for v in value)
+    return 0
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count, total byte size and,
+    optionally, entry age (``ttl`` seconds).
+
+    Values are shared between callers, so anything stored here must be
+    treated as read-only.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=None, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._creating = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = frame_nbytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            # A single value larger than the whole budget is not worth keeping
+            if self.max_bytes is not None and size > self.max_bytes:
+                return value
+            expires = None if self.ttl is None else self._clock() + self.ttl
+            self._entries[key] = (value, size, expires)
+            self._bytes += size
+            self._evict()
+        return value
+
+    def get_or_create(self, key, factory):
+        """Cached value for ``key``, calling ``factory()`` on a miss.
+
+        Concurrent callers missing the same key wait for the first one's
+        result instead of each running the factory.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            creating = self._creating.setdefault(key, threading.Lock())
+        try:
+            with creating:
+                with self._lock:
+                    value = self._lookup(key)
+                if value is _MISSING:
+                    value = self.put(key, factory())
+        finally:
+            with self._lock:
+                if self._creating.get(key) is creating:
+                    del self._creating[key]
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _lookup(self, key):
+        # Caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, size, expires = entry
+        if expires is not None and self._clock() >= expires:
+            del self._entries[key]
+            self._bytes -= size
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _evict(self):
+        if self.ttl is not None:
+            now = self._clock()
+            for key in [k for k, (_, _, expires) in self._entries.items() if now >= expires]:
+                self._bytes -= self._entries.pop(key)[1]
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+
+
+_MISSING = object()
@@ -1,473 +1,470 @@
 import streamlit as st
-import pandas as pd
-import io
+import datetime
+import zipfile
+
+import batch
+import history
+from alerts import ALERT_SPECS, TARGET_COVER_DAYS, cached_alerts, within_cover
+from export import EXPORT_FORMATS, cached_export, export, export_cache, frame_fingerprint
+from jobs import Job
+from loaders import EXCEL_ENGINE, EXCEL_ENGINES, LOAD_WORKERS, content_hash, load_reports
+from pipeline import build_tables, inputs_fingerprint, record_load_stats, results_cache
+from profiling import Profiler, stage
+from rollups import ROLLUP_CHANNELS, ROLLUP_MEASURES, cached_cube, detail_rows, rollup
+from schemas import SCHEMAS, SchemaError
+from snapshot import (
+    SNAPSHOT_EXTENSION, SNAPSHOT_MIME, SNAPSHOTS_AVAILABLE, SnapshotError, read_metadata,
+    read_snapshot, write_snapshot,
+)
+from viewer import paged_table
 
 st.set_page_config(page_title="Stock Movement Analysis Dashboard", layout="wide")
 
 st.title("📊 Stock Movement Analysis Dashboard")
 
+MODES = ["Single account", "Batch (several accounts)"]
+if SNAPSHOTS_AVAILABLE:
+    MODES.append("Load snapshot")
+mode = st.sidebar.radio(
+    "Mode", MODES,
+    help="Batch mode builds the tables for one zip of reports per account against shared PMs; "
+         "Load snapshot restores the tables saved from an earlier run"
+)
+batch_mode = mode == "Batch (several accounts)"
+snapshot_mode = mode == "Load snapshot"
+
 # File uploaders
 st.sidebar.header("Upload Files")
 
-qwtt_inventory_file = st.sidebar.file_uploader("QWTT Inventory (Excel/CSV)", type=['xlsx', 'csv'])
-amazon_stock_file = st.sidebar.file_uploader("Amazon Stock (CSV)", type=['csv'])
-flipkart_business_file = st.sidebar.file_uploader("Flipkart Business Report (Excel)", type=['xlsx'])
-amazon_business_file = st.sidebar.file_uploader(
-    "Amazon Business Report (Excel/CSV)", 
-    type=['xlsx', 'csv']
-)
-amazon_pm_file = st.sidebar.file_uploader("Amazon PM (Excel)", type=['xlsx'])
-flipkart_pm_file = st.sidebar.file_uploader("Flipkart PM (Excel)", type=['xlsx'])
-flipkart_inventory_file = st.sidebar.file_uploader("Flipkart Easycom Inventory (CSV)", type=['csv'])
-
-if all([qwtt_inventory_file, amazon_stock_file, flipkart_business_file, 
-        amazon_business_file, amazon_pm_file, flipkart_pm_file, flipkart_inventory_file]):
-    
-    with st.spinner("Processing data..."):
-        # Load data
-        if qwtt_inventory_file.name.endswith('.csv'):
-            Qwtt_Inventory = pd.read_csv(qwtt_inventory_file)
-        else:
-            Qwtt_Inventory = pd.read_excel(qwtt_inventory_file)
-        Amazon_Stock = pd.read_csv(amazon_stock_file)
-        Flipkart_Business_Report = pd.read_excel(flipkart_business_file)
-        # Try to read the specific sheet for Amazon Business Report if it exists
-        # Load Amazon Business Report (Excel or CSV)
-        if amazon_business_file.name.endswith('.csv'):
-            Amazon_Business_Report = pd.read_csv(amazon_business_file)
-        else:
-            try:
-                Amazon_Business_Report = pd.read_excel(
-                    amazon_business_file, 
-                    sheet_name='BusinessReport-AMAZON'
+if snapshot_mode:
+    snapshot_file = st.sidebar.file_uploader(f"Snapshot (.{SNAPSHOT_EXTENSION})", type=[SNAPSHOT_EXTENSION])
+elif batch_mode:
+    account_files = st.sidebar.file_uploader(
+        "Account reports (one .zip per account)", type=['zip'], accept_multiple_files=True,
+        help="Each zip holds that account's QWTT Inventory, Amazon Stock, Flipkart Business "
+             "Report, Amazon Business Report and Flipkart Easycom Inventory"
+    )
+else:
+    qwtt_inventory_file = st.sidebar.file_uploader("QWTT Inventory (Excel/CSV)", type=['xlsx', 'csv'])
+    amazon_stock_file = st.sidebar.file_uploader("Amazon Stock (CSV)", type=['csv'])
+    flipkart_business_file = st.sidebar.file_uploader("Flipkart Business Report (Excel)", type=['xlsx'])
+    amazon_business_file = st.sidebar.file_uploader(
+        "Amazon Business Report (Excel/CSV)", 
+        type=['xlsx', 'csv']
+    )
+if not snapshot_mode:
+    amazon_pm_file = st.sidebar.file_uploader("Amazon PM (Excel)", type=['xlsx'])
+    flipkart_pm_file = st.sidebar.file_uploader("Flipkart PM (Excel)", type=['xlsx'])
+if not (batch_mode or snapshot_mode):
+    flipkart_inventory_file = st.sidebar.file_uploader("Flipkart Easycom Inventory (CSV)", type=['csv'])
+
+with st.sidebar.expander("Settings"):
+    excel_engine = st.selectbox(
+        "Excel reader",
+        EXCEL_ENGINES,
+        index=EXCEL_ENGINES.index(EXCEL_ENGINE) if EXCEL_ENGINE in EXCEL_ENGINES else 0,
+        help="auto uses the faster calamine reader when installed, otherwise openpyxl"
+    )
+    load_workers = st.number_input(
+        "Parallel load workers",
+        min_value=1, max_value=16, value=max(1, min(LOAD_WORKERS, 16)),
+        help="Processes used to parse changed files concurrently (1 = sequential)"
+    )
+    show_diagnostics = st.checkbox("Show diagnostics", value=False)
+
+profiler = Profiler()
+
+with st.sidebar.expander("History"):
+    record_history = st.checkbox(
+        "Record these business reports in history",
+        value=False,
+        help="Stores per-ASIN / per-Product Id sales for the days the reports cover so "
+             "multi-month views don't need old reports re-uploaded"
+    )
+    record_stock = st.checkbox(
+        "Record these stock reports in history",
+        value=False,
+        help="Stores per-product QWTT, Amazon and Easycom stock for the report date; "
+             "the Stock Movement tab compares the stored days"
+    )
+    report_date = st.date_input("Report date", value=datetime.date.today())
+    report_days = st.number_input(
+        "Days the business reports cover", min_value=1, max_value=365, value=history.REPORT_PERIOD_DAYS,
+        help="The reports' sales are for this many days ending on the report date. "
+             "Also the Reorder Alerts' default sales period"
+    )
+
+
+@st.cache_resource
+def history_connection():
+    return history.connect()
+
+
+def download_section(df, file_stem, key, identity=None):
+    # Files are only generated on request and cached per table, so reruns
+    # don't re-serialise every table. ``identity`` names the table from
+    # what is already known (input fingerprint, table, view settings);
+    # hashing the content on every rerun is the fallback
+    fmt = st.radio("Download format", list(EXPORT_FORMATS), horizontal=True, key=f"{key}_format")
+    extension, mime = EXPORT_FORMATS[fmt]
+    fingerprint = identity if identity is not None else frame_fingerprint(df)
+
+    data = cached_export(df, fmt, fingerprint)
+    if data is None and st.button(f"Prepare {fmt} download", key=f"{key}_prepare"):
+        with st.spinner(f"Writing {len(df):,} rows..."), stage(profiler, f"export:{file_stem}") as info:
+            data = export(df, fmt, fingerprint)
+            info["rows"] = len(df)
+    if data is not None:
+        st.download_button(
+            label=f"📥 Download {fmt}",
+            data=data,
+            file_name=f"{file_stem}.{extension}",
+            mime=mime,
+            key=f"{key}_download"
+        )
+
+
+def watch_job(job, placeholder):
+    # Returns when the job ends; any widget change or upload reruns the
+    # script (and so leaves this loop) before that
+    while not job.wait(0.25):
+        text, fraction = job.status()
+        placeholder.progress(fraction or 0.0, text=f"{text}...")
+    placeholder.empty()
+
+
+def show_diagnostics_panel():
+    with st.expander("Diagnostics", expanded=True):
+        st.caption("Per-stage wall time, memory (RSS) and row counts for this run; peak_rss_mb is the "
+                   "highest RSS while that stage ran (Linux only), not the server's all-time peak. "
+                   "parse:* rows may have run in worker processes, so they carry no memory figures.")
+        st.dataframe(profiler.to_frame(), use_container_width=True, hide_index=True)
+        st.caption(
+            f"Shared result cache: {len(results_cache)} input set(s), "
+            f"{results_cache.nbytes / 1024 ** 2:,.0f} MB, "
+            f"{results_cache.hits:,} hits / {results_cache.misses:,} misses"
+        )
+        if profiler.memory:
+            st.caption("Loaded reports: memory as held (identifiers dictionary-encoded) "
+                       "vs. with every identifier as a Python string.")
+            st.dataframe(profiler.memory_frame(), use_container_width=True, hide_index=True)
+        st.download_button(
+            label="📥 Download JSON",
+            data=profiler.to_json(indent=2),
+            file_name="stock_movement_profile.json",
+            mime="application/json",
+            key="diagnostics_json"
+        )
+
+
+# Pipeline stages reported as progress while the tables are built
+BUILD_STEPS = {
+    "sales_pivots": "Building sales pivots",
+    "amazon_business_pivot": "Merging Amazon sales with the PM and QWTT stock",
+    "flipkart_business_pivot": "Merging Flipkart sales with the PM and Easycom stock",
+    "flipkart_qwtt_inward": "Building Flipkart QWTT Inward",
+    "amazon_qwtt_inward": "Building Amazon QWTT Inward",
+    "validate": "Checking data quality",
+}
+
+# A background build (see below) is only wanted while the current inputs
+# still produce its key: clearing an upload or switching mode cancels it
+# here, before any branch below can stop the script
+sources = fingerprint = None
+if not (batch_mode or snapshot_mode) and all([
+    qwtt_inventory_file, amazon_stock_file, flipkart_business_file,
+    amazon_business_file, amazon_pm_file, flipkart_pm_file, flipkart_inventory_file
+]):
+    uploads = {
+        "qwtt_inventory": qwtt_inventory_file,
+        "amazon_stock": amazon_stock_file,
+        "flipkart_business": flipkart_business_file,
+        "amazon_business": amazon_business_file,
+        "amazon_pm": amazon_pm_file,
+        "flipkart_pm": flipkart_pm_file,
+        "flipkart_inventory": flipkart_inventory_file,
+    }
+    sources = {kind: (f.getvalue(), f.name) for kind, f in uploads.items()}
+    fingerprint = inputs_fingerprint(sources, excel_engine)
+job = st.session_state.get("job")
+if job is not None and job.key != fingerprint:
+    job.cancel()
+    del st.session_state["job"]
+    job = None
+
+# =============================
+# BATCH MODE
+# =============================
+
+# (results key, tab title, metric columns to total, search columns)
+BATCH_VIEWS = [
+    ("amazon_business_pivot", "Amazon Business Pivot",
+     ["Total Orders", "CP As Per Qty", "QWTT Stock"], ("(Parent) ASIN", "EasycomSKU")),
+    ("flipkart_business_pivot", "Flipkart Business Pivot",
+     ["Final Sale Units", "CP As Per Qty", "QWTT Stock"], ("Product Id", "EasycomSKU")),
+    ("flipkart_qwtt_inward", "Flipkart QWTT Inward",
+     ["Total Orders", "Flipkart Sales", "Flipkart QWTT Stock"], ("(Parent) ASIN", "EasycomSKU", "FNS")),
+    ("amazon_qwtt_inward", "Amazon QWTT Inward",
+     ["Final Sale Units", "Amazon Sales", "Amazon Stock"], ("Product Id", "EasycomSKU", "Amazon ASIN")),
+]
+
+if batch_mode:
+    if not (account_files and amazon_pm_file and flipkart_pm_file):
+        st.info("👈 Upload one zip of reports per account plus the shared Amazon and Flipkart PM.")
+        st.stop()
+
+    accounts = {}
+    for f in account_files:
+        name = batch.account_name(f.name, accounts)
+        try:
+            accounts[name] = batch.read_zip(f.getvalue())
+        except (batch.AccountError, zipfile.BadZipFile) as e:
+            st.error(f"❌ {f.name}: {e}")
+            st.stop()
+
+    with st.spinner(f"Processing {len(accounts)} accounts..."):
+        try:
+            batch_results = batch.run_batch(
+                accounts,
+                {"amazon_pm": (amazon_pm_file.getvalue(), amazon_pm_file.name),
+                 "flipkart_pm": (flipkart_pm_file.getvalue(), flipkart_pm_file.name)},
+                engine=excel_engine, workers=int(load_workers), profiler=profiler
+            )
+        except SchemaError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+
+    for account, message in batch_results["errors"].items():
+        st.warning(f"⚠️ {account}: {message}")
+    if not batch_results["accounts"]:
+        st.stop()
+
+    view = st.selectbox("Account", ["All accounts"] + list(batch_results["accounts"]))
+    if view == "All accounts":
+        tables, prefix, filter_columns = batch_results["combined"], "batch_all", ("Account", "Brand", "Brand Manager")
+    else:
+        tables, prefix, filter_columns = batch_results["accounts"][view], f"batch_{view}", ("Brand", "Brand Manager")
+
+    for tab, (key, title, totals, search_columns) in zip(st.tabs([v[1] for v in BATCH_VIEWS]), BATCH_VIEWS):
+        with tab:
+            st.header(f"{title} — {view}")
+            table = tables[key]
+            zero_only = False
+            if key.endswith("qwtt_inward"):
+                stock_column = totals[-1]
+                zero_only = st.checkbox(f"Show only products with zero {stock_column}", value=False, key=f"{prefix}_{key}_zero")
+                if zero_only:
+                    table = tables[f"{key}_filter"]
+            paged_table(table, f"{prefix}_{key}", filter_columns=filter_columns, search_columns=search_columns)
+            cols = st.columns(len(totals) + 1)
+            cols[0].metric("Total Products", f"{len(table):,}")
+            for col, column in zip(cols[1:], totals):
+                col.metric(f"Total {column}", f"{table[column].sum():,.0f}")
+            if view == "All accounts":
+                st.dataframe(
+                    table.groupby("Account", observed=False)[totals].sum(),
+                    use_container_width=True
                 )
-            except:
-                Amazon_Business_Report = pd.read_excel(amazon_business_file)
-
-                
-        Amazon_PM = pd.read_excel(amazon_pm_file)
-        Flipkart_PM = pd.read_excel(flipkart_pm_file)
-        Flipkart_Easycom_Inventory = pd.read_csv(flipkart_inventory_file)
-        
-        Qwtt_Inventory["Sellable"] = (
-            Qwtt_Inventory["Sellable"]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .str.strip()
-        )
-
-        Qwtt_Inventory["Sellable"] = pd.to_numeric(
-            Qwtt_Inventory["Sellable"], errors="coerce"
-        ).fillna(0)
-
-        # Process QWTT Inventory
-        Qwtt_Inventory_Pivot = (
-            Qwtt_Inventory
-            .pivot_table(index="Asin", values="Sellable", aggfunc="sum")
-            .reset_index()
-            .sort_values(by="Sellable", ascending=False)
-        )
-        
-        # Process Amazon Stock
-        Amazon_Stock["afn-warehouse-quantity"] = (
-            Amazon_Stock["afn-warehouse-quantity"]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .str.strip()
-        )
-
-        Amazon_Stock["afn-warehouse-quantity"] = pd.to_numeric(
-            Amazon_Stock["afn-warehouse-quantity"], errors="coerce"
-        ).fillna(0)
-
-        amazon_stock_pivot = (
-            Amazon_Stock
-            .pivot_table(index="asin", values="afn-warehouse-quantity", aggfunc="sum")
-            .reset_index()
-        )
-        
-        # Process Flipkart Business Report
-        Flipkart_Business_Report["Final Sale Units"] = (
-            Flipkart_Business_Report["Final Sale Units"]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .str.strip()
-        )
-
-        Flipkart_Business_Report["Final Sale Units"] = pd.to_numeric(
-            Flipkart_Business_Report["Final Sale Units"], errors="coerce"
-        ).fillna(0)
-
-        Flipkart_Business_Report.loc[
-            Flipkart_Business_Report["Final Sale Units"] < 0,
-            "Final Sale Units"
-        ] = 0
-
-        # =============================
-        # FLIPKART SALES TRUTH PIVOT
-        # =============================
-
-        flipkart_sales_pivot = (
-            Flipkart_Business_Report
-            .pivot_table(
-                index="Product Id",
-                values="Final Sale Units",
-                aggfunc="sum"
+            download_section(
+                table, f"{key}_{view.replace(' ', '_').lower()}", key=f"{prefix}_{key}",
+                identity=None if batch_results["key"] is None else (batch_results["key"], view, key, zero_only)
             )
-            .reset_index()
-        )
-
-        # SAVE CORRECT TOTALS (VERY IMPORTANT)
-        flipkart_total_sale_units_truth = int(flipkart_sales_pivot["Final Sale Units"].sum())
-        flipkart_total_products_truth = len(flipkart_sales_pivot)
-
-        
-        # Flipkart_Business_Pivot = (
-        #     Flipkart_Business_Report
-        #     .pivot_table(index="Product Id", values="Final Sale Units", aggfunc="sum")
-        #     .reset_index()
-        # )
-        
-        # Process Amazon Business Report
-        # Ensure numeric columns (handles CSV + Excel safely)
-        Amazon_Business_Report["Total Order Items"] = (
-            Amazon_Business_Report["Total Order Items"]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .str.strip()
-        )
-
-        Amazon_Business_Report["Total Order Items"] = pd.to_numeric(
-            Amazon_Business_Report["Total Order Items"], errors="coerce"
-        ).fillna(0)
-
-
-        Amazon_Business_Report["Total Order Items - B2B"] = (
-            Amazon_Business_Report["Total Order Items - B2B"]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .str.strip()
-        )
 
-        Amazon_Business_Report["Total Order Items - B2B"] = pd.to_numeric(
-            Amazon_Business_Report["Total Order Items - B2B"], errors="coerce"
-        ).fillna(0)
-
-
-        Amazon_Business_Report["Total Orders"] = (
-            Amazon_Business_Report["Total Order Items"] +
-            Amazon_Business_Report["Total Order Items - B2B"]
-        )
-        
-        # =========================
-        # AMAZON SALES TRUTH PIVOT
-        # =========================
-
-        amazon_sales_pivot = (
-            Amazon_Business_Report
-            .pivot_table(
-                index="(Parent) ASIN",
-                values="Total Orders",
-                aggfunc="sum"
+    if show_diagnostics:
+        show_diagnostics_panel()
+    st.stop()
+
+if snapshot_mode or sources is not None:
+
+    building = None
+    if snapshot_mode:
+        if snapshot_file is None:
+            st.info("👈 Upload a snapshot saved from an earlier run (Single account → Snapshot).")
+            st.stop()
+        snapshot_data = snapshot_file.getvalue()
+        try:
+            metadata = read_metadata(snapshot_data)
+            fingerprint = metadata["fingerprint"]
+            # Keyed like freshly built tables, so a snapshot and the uploads
+            # it was made from share one cache entry
+            with st.spinner("Loading snapshot..."), stage(profiler, "snapshot") as info:
+                results = results_cache.get_or_create(fingerprint, lambda: read_snapshot(snapshot_data))
+                info["rows"] = sum(len(results[key]) for key in metadata["tables"])
+        except SnapshotError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+
+        with st.sidebar.expander("Snapshot", expanded=True):
+            st.caption(f"Saved {metadata['created']} (Excel reader: {metadata['excel_engine']})")
+            for kind, source in metadata["inputs"].items():
+                st.caption(f"{source['name']}: {source['bytes']:,} bytes, hash {source['hash'][:12]}")
+
+    else:
+        # Load data (parsed + cleaned frames are cached by file content hash,
+        # so reruns only re-parse files that actually changed).
+        # Tables are built in a background job so the page stays responsive:
+        # changed inputs cancel it (above), and the tables on screen are only
+        # replaced once a build has finished
+        def build_in_background(job):
+            steps = len(sources) + len(BUILD_STEPS)
+            load_stats = job.stats["load"] = {}
+
+            def report_loaded(kind, done, total):
+                job.progress(f"Loading reports {done}/{total}", done, steps)
+
+            def stage_started(name):
+                if name in BUILD_STEPS:
+                    job.progress(BUILD_STEPS[name], len(sources) + list(BUILD_STEPS).index(name), steps)
+
+            job_profiler = job.stats["profiler"] = Profiler(on_stage=stage_started)
+            report_loaded(None, 0, len(sources))
+
+            def compute_tables():
+                with stage(job_profiler, "load") as info:
+                    frames = load_reports(
+                        sources, engine=excel_engine, workers=int(load_workers),
+                        stats=load_stats, progress=report_loaded
+                    )
+                    info["rows"] = sum(len(df) for df in frames.values())
+                record_load_stats(job_profiler, load_stats)
+                if show_diagnostics:
+                    job_profiler.record_memory(frames)
+                return build_tables(frames, job_profiler)
+
+            # Finished tables are shared across sessions: another user who
+            # uploaded the same files already paid for them. job.key, not
+            # fingerprint: the script may point that at the shown tables
+            return results_cache.get_or_create(job.key, compute_tables)
+
+        results = results_cache.get(fingerprint)
+        if results is None:
+            if job is None:
+                job = st.session_state["job"] = Job(fingerprint, build_in_background)
+            if not job.finished:
+                building = job
+            elif job.cancelled:
+                st.info("Processing was cancelled.")
+                if st.button("Process again", key="job_restart"):
+                    st.session_state["job"] = Job(fingerprint, build_in_background)
+                    st.rerun()
+                st.stop()
+            elif isinstance(job.error, SchemaError):
+                st.error(f"❌ {job.error}")
+                st.stop()
+            elif job.error is not None:
+                raise job.error
+            else:
+                results = job.result
+
+        if building is not None:
+            job_status = st.container()
+            with job_status:
+                progress_bar = st.empty()
+                if st.button("Cancel processing", key="job_cancel"):
+                    building.cancel()
+                    st.rerun()
+            if "shown" not in st.session_state:
+                watch_job(building, progress_bar)
+                st.rerun()
+            # Keep showing the previous tables until the new ones are complete
+            fingerprint, results = st.session_state["shown"]
+            st.caption("Showing the previous results while the new files are processed.")
+        else:
+            st.session_state["shown"] = (fingerprint, results)
+            if job is not None and job.key == fingerprint and "profiler" in job.stats:
+                # The build ran in the job, so its stages are on the job's profiler;
+                # copied, as this run's own stages must not pile up on it
+                profiler.include(job.stats["profiler"])
+                load_stats, total_seconds = job.stats["load"], job.seconds
+            else:
+                load_stats, total_seconds = {}, 0.0
+
+            with st.sidebar.expander("Load times"):
+                if not load_stats:
+                    st.caption("Served from the shared result cache")
+                else:
+                    st.caption(f"Total: {total_seconds:.2f}s wall clock (load + build)")
+                for kind, stat in load_stats.items():
+                    source = "cached" if stat["cached"] else f"{stat['seconds']:.2f}s"
+                    st.caption(f"{uploads[kind].name}: {source} ({stat['engine']}, {stat['rows']:,} rows)")
+
+        if SNAPSHOTS_AVAILABLE and building is None:
+            with st.sidebar.expander("Snapshot"):
+                st.caption("Every table, the report totals and the input fingerprints in one file. "
+                           "Open it later with Mode → Load snapshot, without the reports.")
+                snapshot_key = (fingerprint, "Snapshot")
+                snapshot_bytes = export_cache.get(snapshot_key)
+                if snapshot_bytes is None and st.button("Prepare snapshot", key="snapshot_prepare"):
+                    with st.spinner("Writing snapshot..."), stage(profiler, "export:snapshot"):
+                        snapshot_bytes = export_cache.get_or_create(
+                            snapshot_key, lambda: write_snapshot(results, fingerprint, sources, excel_engine)
+                        )
+                if snapshot_bytes is not None:
+                    st.download_button(
+                        label="📥 Download snapshot",
+                        data=snapshot_bytes,
+                        file_name=f"stock_movement_{datetime.date.today():%Y%m%d}.{SNAPSHOT_EXTENSION}",
+                        mime=SNAPSHOT_MIME,
+                        key="snapshot_download"
+                    )
+
+    amazon_business_pivot = results["amazon_business_pivot"]
+    Flipkart_Business_Pivot = results["flipkart_business_pivot"]
+    flipkart_qwtt_inward = results["flipkart_qwtt_inward"]
+    flipkart_qwtt_inward_filter = results["flipkart_qwtt_inward_filter"]
+    amazon_qwtt_inward = results["amazon_qwtt_inward"]
+    amazon_qwtt_inward_filter = results["amazon_qwtt_inward_filter"]
+
+    amazon_total_orders_truth = results["amazon_total_orders_truth"]
+    amazon_total_products_truth = results["amazon_total_products_truth"]
+    flipkart_total_sale_units_truth = results["flipkart_total_sale_units_truth"]
+    flipkart_total_products_truth = results["flipkart_total_products_truth"]
+    
+    if record_history and not snapshot_mode and building is None:
+        conn = history_connection()
+        with stage(profiler, "history"):
+            for channel, kind in [("amazon", "amazon_business"), ("flipkart", "flipkart_business")]:
+                if history.ingest_sales(
+                    conn, channel, report_date, results[f"{channel}_sales_pivot"],
+                    content_hash(uploads[kind].getvalue()), int(report_days)
+                ):
+                    st.sidebar.success(
+                        f"Saved {channel.title()} sales for the {int(report_days)} days to {report_date:%d %b %Y}"
+                    )
+
+    if record_stock and not snapshot_mode and building is None:
+        conn = history_connection()
+        with stage(profiler, "history:stock"):
+            # Normally served from the report cache the build just filled
+            stock_reports = load_reports(
+                {kind: sources[kind] for kind in history.STOCK_SOURCES}, engine=excel_engine, workers=1
             )
-            .reset_index()
-        )
-
-        # SAVE CORRECT TOTALS (VERY IMPORTANT)
-        amazon_total_orders_truth = int(amazon_sales_pivot["Total Orders"].sum())
-        amazon_total_products_truth = len(amazon_sales_pivot)
-
-        # this pivot doesn't give correct input 
-        # amazon_business_pivot = (
-        #     Amazon_Business_Report
-        #     .pivot_table(index="(Parent) ASIN", values="Total Orders", aggfunc="sum")
-        #     .reset_index()
-        #     .sort_values(by="Total Orders", ascending=False)
-        # )
-        
-        # Clean and standardize columns
-        Amazon_PM["ASIN"] = Amazon_PM["ASIN"].astype(str).str.strip().str.upper()
-        Amazon_PM["Vendor SKU Codes"] = Amazon_PM["Vendor SKU Codes"].astype(str).str.strip()
-        Amazon_PM["EasycomSKU"] = Amazon_PM["EasycomSKU"].astype(str).str.strip()
-        
-        # Remove duplicates from Amazon PM to prevent expansion during merge
-        # Priority sort: Rows with EasycomSKU and CP come first
-        Amazon_PM["EasycomSKU_Clean"] = Amazon_PM["EasycomSKU"].astype(str).replace(["nan", ""], pd.NA)
-        Amazon_PM = (
-            Amazon_PM.sort_values(by=["EasycomSKU_Clean", "CP"], na_position='last', ascending=[True, False])
-            .drop_duplicates(subset=['ASIN'])
-            .drop(columns=["EasycomSKU_Clean"])
-        )
-        
-        amazon_sales_pivot["(Parent) ASIN"] = (
-            amazon_sales_pivot["(Parent) ASIN"].astype(str).str.strip().str.upper()
-        )
-        amazon_sales_pivot.columns = amazon_sales_pivot.columns.str.strip()
-        
-        # Ensure numeric CP and Total Orders
-        Amazon_PM["CP"] = (
-            Amazon_PM["CP"]
-            .astype(str)
-            .str.replace("₹", "", regex=False)
-            .str.replace(",", "", regex=False)
-            .str.replace("--", "", regex=False)
-            .str.strip()
-        )
-
-        Amazon_PM["CP"] = pd.to_numeric(
-            Amazon_PM["CP"], errors="coerce"
-        ).fillna(0)
-        
-        # Merge Amazon Business with PM
-        
-        amazon_business_pivot = amazon_sales_pivot.merge(
-            Amazon_PM[[
-                "ASIN", "Brand", "Brand Manager", "Product Name",
-                "Vendor SKU Codes", "EasycomSKU", "CP"
-            ]],
-            left_on="(Parent) ASIN",
-            right_on="ASIN",
-            how="left"
-        )
-
-        # amazon_business_pivot = amazon_business_pivot.merge(
-        #     Amazon_PM[["ASIN", "Brand", "Brand Manager", "Product Name", 
-        #               "Vendor SKU Codes", "EasycomSKU", "CP"]],
-        #     left_on="(Parent) ASIN",
-        #     right_on="ASIN",
-        #     how="left"
-        # )
-        
-        amazon_business_pivot = amazon_business_pivot[[
-            "(Parent) ASIN", "Brand", "Brand Manager", "Product Name",
-            "Vendor SKU Codes", "EasycomSKU", "Total Orders", "CP"
-        ]]
-
-        # Clean "nan" strings and set actual NaNs for better sorting
-        amazon_business_pivot["EasycomSKU"] = amazon_business_pivot["EasycomSKU"].replace(["nan", ""], pd.NA)
-        
-        # Sort to prioritize rows with EasycomSKU and then drop duplicates by ASIN
-        # This keeps unmapped items but prefers the mapped version if duplicates exist
-        # amazon_business_pivot = (
-        #     amazon_business_pivot.sort_values(by="EasycomSKU", na_position='last')
-        #     .drop_duplicates(subset=["(Parent) ASIN"])
-        # )
+            for kind, report in stock_reports.items():
+                if history.ingest_stock(conn, kind, report_date, report, content_hash(sources[kind][0])):
+                    st.sidebar.success(f"Saved {SCHEMAS[kind]['label']} stock for {report_date:%d %b %Y}")
 
+    # Snapshots saved before validation existed carry no quality tables
+    reconciliation = results.get("reconciliation")
+    if reconciliation is not None and not reconciliation["OK"].all():
+        failed = ", ".join(reconciliation.loc[~reconciliation["OK"], "Check"])
+        st.warning(f"⚠️ Table totals differ from the reports: {failed} (see Data Quality)")
 
-        # amazon_business_pivot["Total Orders"] = pd.to_numeric(
-        #     amazon_business_pivot["Total Orders"], 
-        #     errors="coerce"
-        # ).fillna(0)
-
-        amazon_business_pivot["CP As Per Qty"] = (
-            amazon_business_pivot["CP"] * amazon_business_pivot["Total Orders"]
-        )
-
-        # Add QWTT Stock to Amazon
-        Qwtt_Inventory_Pivot["Asin"] = (
-            Qwtt_Inventory_Pivot["Asin"].astype(str).str.strip().str.upper()
-        )
-        qwtt_stock_map = Qwtt_Inventory_Pivot.set_index("Asin")["Sellable"]
-        amazon_business_pivot["QWTT Stock"] = (
-            amazon_business_pivot["(Parent) ASIN"]
-            .map(qwtt_stock_map)
-            .fillna(0)
-            .astype(int)
-        )
-        
-        # Process Flipkart PM
-        Flipkart_PM.columns = Flipkart_PM.columns.str.strip()
-        Flipkart_PM["FNS"] = Flipkart_PM["FNS"].astype(str).str.strip().str.upper()
-        Flipkart_PM["EasycomSKU"] = Flipkart_PM["EasycomSKU"].astype(str).str.strip()
-        
-        # Remove duplicates from Flipkart PM
-        # Priority sort: Rows with EasycomSKU and CP come first
-        Flipkart_PM["EasycomSKU_Clean"] = Flipkart_PM["EasycomSKU"].astype(str).replace(["nan", ""], pd.NA)
-        Flipkart_PM = (
-            Flipkart_PM.sort_values(by=["EasycomSKU_Clean", "CP"], na_position='last', ascending=[True, False])
-            .drop_duplicates(subset=['FNS'])
-            .drop(columns=["EasycomSKU_Clean"])
-        )
-        
-        flipkart_sales_pivot.columns = flipkart_sales_pivot.columns.str.strip()
-        flipkart_sales_pivot["Product Id"] = flipkart_sales_pivot["Product Id"].astype(str).str.strip().str.upper()
-        
-        Flipkart_Business_Pivot = flipkart_sales_pivot.merge(
-            Flipkart_PM[[
-                "FNS", "Brand", "Brand Manager", "Product Name",
-                "Vendor SKU Codes", "EasycomSKU", "CP"
-            ]],
-            left_on="Product Id",
-            right_on="FNS",
-            how="left"
-        )
-        
-        # Flipkart_Business_Pivot = Flipkart_Business_Pivot.merge(
-        #     Flipkart_PM[["FNS", "Brand", "Brand Manager", "Product Name",
-        #                 "Vendor SKU Codes", "EasycomSKU", "CP"]],
-        #     left_on="Product Id",
-        #     right_on="FNS",
-        #     how="left"
-        # )
-        
-        Flipkart_Business_Pivot = Flipkart_Business_Pivot[[
-            "Product Id", "Brand", "Brand Manager", "Product Name",
-            "Vendor SKU Codes", "EasycomSKU", "Final Sale Units", "CP", "FNS"
-        ]]
-        
-        # Clean "nan" strings and set actual NaNs
-        Flipkart_Business_Pivot["EasycomSKU"] = Flipkart_Business_Pivot["EasycomSKU"].replace(["nan", ""], pd.NA)
-        
-        # Sort to prioritize rows with EasycomSKU and drop duplicates by Product Id
-        Flipkart_Business_Pivot = (
-            Flipkart_Business_Pivot.sort_values(by="EasycomSKU", na_position='last')
-            .drop_duplicates(subset=["Product Id"])
-        )
-        
-        # Flipkart_Business_Pivot["CP As Per Qty"] = (
-        #     Flipkart_Business_Pivot["CP"] * Flipkart_Business_Pivot["Final Sale Units"]
-        # )
-        Flipkart_Business_Pivot["CP"] = (
-            Flipkart_Business_Pivot["CP"]
-            .astype(str)
-            .str.replace("₹", "", regex=False)
-            .str.replace(",", "", regex=False)
-            .str.strip()
-        )
-
-        Flipkart_Business_Pivot["CP"] = pd.to_numeric(
-            Flipkart_Business_Pivot["CP"], errors="coerce"
-        ).fillna(0)
-
-        Flipkart_Business_Pivot["Final Sale Units"] = pd.to_numeric(
-            Flipkart_Business_Pivot["Final Sale Units"], errors="coerce"
-        ).fillna(0)
-
-        Flipkart_Business_Pivot["CP As Per Qty"] = (
-            Flipkart_Business_Pivot["CP"] * Flipkart_Business_Pivot["Final Sale Units"]
-        )
-        
-        # Add Flipkart QWTT Stock
-        
-        Flipkart_Easycom_Inventory["old_quantity"] = (
-            Flipkart_Easycom_Inventory["old_quantity"]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .str.strip()
-        )
-
-        Flipkart_Easycom_Inventory["old_quantity"] = pd.to_numeric(
-            Flipkart_Easycom_Inventory["old_quantity"], errors="coerce"
-        ).fillna(0)
-
-        Flipkart_Easycom_Inventory["sku"] = (
-            Flipkart_Easycom_Inventory["sku"].str.replace(r"^`", "", regex=True)
-        )
-        
-        flipkart_inventory_pivot = (
-            Flipkart_Easycom_Inventory
-            .pivot_table(index="sku", values="old_quantity", aggfunc="sum")
-            .reset_index()
-        )
-        
-        flipkart_stock_map = flipkart_inventory_pivot.set_index("sku")["old_quantity"]
-        Flipkart_Business_Pivot["QWTT Stock"] = (
-            Flipkart_Business_Pivot["EasycomSKU"].map(flipkart_stock_map)
-        )
-        
-        # Create Flipkart QWTT Inward
-        flipkart_qwtt_inward = amazon_business_pivot.copy()
-        
-        flipkart_sales_map = (
-            Flipkart_Business_Pivot
-            .groupby("EasycomSKU")["Final Sale Units"]
-            .sum()
-        )
-        flipkart_qwtt_inward["Flipkart Sales"] = (
-            flipkart_qwtt_inward["EasycomSKU"]
-            .map(flipkart_sales_map)
-            .fillna(0)
-            .astype(int)
-        )
-        
-        flipkart_stock_map_inward = (
-            Flipkart_Business_Pivot
-            .groupby("EasycomSKU")["QWTT Stock"]
-            .sum()
-        )
-        flipkart_qwtt_inward["Flipkart QWTT Stock"] = (
-            flipkart_qwtt_inward["EasycomSKU"]
-            .map(flipkart_stock_map_inward)
-            .fillna(0)
-            .astype(int)
-        )
-        
-        flipkart_fns_map = (
-            Flipkart_Business_Pivot
-            .groupby("EasycomSKU")["FNS"]
-            .first()
-        )
-
-        flipkart_qwtt_inward["FNS"] = (
-            flipkart_qwtt_inward["EasycomSKU"].map(flipkart_fns_map)
-        )
-        
-        flipkart_qwtt_inward_filter = flipkart_qwtt_inward[
-            flipkart_qwtt_inward["Flipkart QWTT Stock"] == 0
-        ].reset_index(drop=True)
-        
-        # Create Amazon QWTT Inward
-        amazon_qwtt_inward = Flipkart_Business_Pivot.copy()
-        
-        amazon_sales_map = (
-            amazon_business_pivot
-            .groupby("EasycomSKU")["Total Orders"]
-            .sum()
-        )
-        amazon_qwtt_inward["Amazon Sales"] = (
-            amazon_qwtt_inward["EasycomSKU"]
-            .map(amazon_sales_map)
-            .fillna(0)
-            .astype(int)
-        )
-        
-        amazon_stock_map = (
-            amazon_business_pivot
-            .groupby("EasycomSKU")["QWTT Stock"]
-            .sum()
-        )
-        amazon_qwtt_inward["Amazon Stock"] = (
-            amazon_qwtt_inward["EasycomSKU"]
-            .map(amazon_stock_map)
-            .fillna(0)
-            .astype(int)
-        )
-        
-        amazon_asin_map = (
-            amazon_business_pivot
-            .groupby("EasycomSKU")["(Parent) ASIN"]
-            .first()
-        )
-
-        amazon_qwtt_inward["Amazon ASIN"] = (
-            amazon_qwtt_inward["EasycomSKU"].map(amazon_asin_map)
-        )
-        
-        amazon_qwtt_inward_filter = amazon_qwtt_inward[
-            amazon_qwtt_inward["Amazon Stock"] == 0
-        ].reset_index(drop=True)
-    
     # Display tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs([
         "Amazon Business Pivot",
         "Flipkart Business Pivot",
         "Flipkart QWTT Inward",
-        "Amazon QWTT Inward"
+        "Amazon QWTT Inward",
+        "Reorder Alerts",
+        "Data Quality",
+        "Sales History",
+        "Stock Movement",
+        "Brand Rollup"
     ])
     
     with tab1:
         st.header("Amazon Business Pivot")
-        st.dataframe(amazon_business_pivot, use_container_width=True, height=600)
+        paged_table(amazon_business_pivot, "amazon_business_pivot", search_columns=("(Parent) ASIN", "EasycomSKU"))
         st.write("TABLE Total Orders:", amazon_business_pivot["Total Orders"].sum())
         
         col1, col2 = st.columns(2)
@@ -481,20 +478,12 @@ if all([qwtt_inventory_file, amazon_stock_file, flipkart_business_file,
             st.metric("Total CP Value", f"₹{amazon_business_pivot['CP As Per Qty'].sum():,.2f}")
             st.metric("Total QWTT Stock", f"{amazon_business_pivot['QWTT Stock'].sum():,.0f}")
         
-        # Download button
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            amazon_business_pivot.to_excel(writer, index=False)
-        st.download_button(
-            label="📥 Download Excel",
-            data=buffer.getvalue(),
-            file_name="amazon_business_pivot.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        download_section(amazon_business_pivot, "amazon_business_pivot", key="amazon_business_pivot",
+                         identity=(fingerprint, "amazon_business_pivot"))
     
     with tab2:
         st.header("Flipkart Business Pivot")
-        st.dataframe(Flipkart_Business_Pivot, use_container_width=True, height=600)
+        paged_table(Flipkart_Business_Pivot, "flipkart_business_pivot", search_columns=("Product Id", "EasycomSKU"))
         
         col1, col2 = st.columns(2)
         with col1:
@@ -506,15 +495,8 @@ if all([qwtt_inventory_file, amazon_stock_file, flipkart_business_file,
             st.metric("Total CP Value", f"₹{Flipkart_Business_Pivot['CP As Per Qty'].sum():,.2f}")
             st.metric("Total QWTT Stock", f"{Flipkart_Business_Pivot['QWTT Stock'].sum():,.0f}")
         
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            Flipkart_Business_Pivot.to_excel(writer, index=False)
-        st.download_button(
-            label="📥 Download Excel",
-            data=buffer.getvalue(),
-            file_name="flipkart_business_pivot.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        download_section(Flipkart_Business_Pivot, "flipkart_business_pivot", key="flipkart_business_pivot",
+                         identity=(fingerprint, "flipkart_business_pivot"))
     
     with tab3:
         st.header("Flipkart QWTT Inward")
@@ -522,11 +504,10 @@ if all([qwtt_inventory_file, amazon_stock_file, flipkart_business_file,
         show_filter = st.checkbox("Show only products with zero Flipkart QWTT Stock", value=False)
         
         if show_filter:
-            st.dataframe(flipkart_qwtt_inward_filter, use_container_width=True, height=600)
             data_to_show = flipkart_qwtt_inward_filter
         else:
-            st.dataframe(flipkart_qwtt_inward, use_container_width=True, height=600)
             data_to_show = flipkart_qwtt_inward
+        paged_table(data_to_show, "flipkart_qwtt_inward", search_columns=("(Parent) ASIN", "EasycomSKU", "FNS"))
         
         col1, col2 = st.columns(2)
         with col1:
@@ -536,15 +517,8 @@ if all([qwtt_inventory_file, amazon_stock_file, flipkart_business_file,
             st.metric("Total Flipkart Sales", f"{data_to_show['Flipkart Sales'].sum():,.0f}")
             st.metric("Total Flipkart QWTT Stock", f"{data_to_show['Flipkart QWTT Stock'].sum():,.0f}")
         
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            data_to_show.to_excel(writer, index=False)
-        st.download_button(
-            label="📥 Download Excel",
-            data=buffer.getvalue(),
-            file_name="flipkart_qwtt_inward.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        download_section(data_to_show, "flipkart_qwtt_inward", key="flipkart_qwtt_inward",
+                         identity=(fingerprint, "flipkart_qwtt_inward", show_filter))
     
     with tab4:
         st.header("Amazon QWTT Inward")
@@ -552,11 +526,10 @@ if all([qwtt_inventory_file, amazon_stock_file, flipkart_business_file,
         show_filter = st.checkbox("Show only products with zero Amazon Stock", value=False, key="amazon_filter")
         
         if show_filter:
-            st.dataframe(amazon_qwtt_inward_filter, use_container_width=True, height=600)
             data_to_show = amazon_qwtt_inward_filter
         else:
-            st.dataframe(amazon_qwtt_inward, use_container_width=True, height=600)
             data_to_show = amazon_qwtt_inward
+        paged_table(data_to_show, "amazon_qwtt_inward", search_columns=("Product Id", "EasycomSKU", "Amazon ASIN"))
         
         col1, col2 = st.columns(2)
         with col1:
@@ -566,15 +539,203 @@ if all([qwtt_inventory_file, amazon_stock_file, flipkart_business_file,
             st.metric("Total Amazon Sales", f"{data_to_show['Amazon Sales'].sum():,.0f}")
             st.metric("Total Amazon Stock", f"{data_to_show['Amazon Stock'].sum():,.0f}")
         
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            data_to_show.to_excel(writer, index=False)
-        st.download_button(
-            label="📥 Download Excel",
-            data=buffer.getvalue(),
-            file_name="amazon_qwtt_inward.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        download_section(data_to_show, "amazon_qwtt_inward", key="amazon_qwtt_inward",
+                         identity=(fingerprint, "amazon_qwtt_inward", show_filter))
+
+    with tab5:
+        st.header("Reorder Alerts")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            alert_table = st.radio(
+                "Replenish",
+                list(ALERT_SPECS),
+                format_func=lambda t: f"{ALERT_SPECS[t][0]} (vs {ALERT_SPECS[t][1]})",
+                key="alerts_table"
+            )
+        with col2:
+            period_days = st.number_input(
+                "Days covered by the business reports", min_value=1, max_value=365,
+                value=int(report_days), key="alerts_period"
+            )
+        with col3:
+            target_days = st.number_input(
+                "Target days of cover", min_value=1, max_value=365,
+                value=TARGET_COVER_DAYS, key="alerts_target"
+            )
+
+        # Computed once per data + settings and sorted by cover, so moving
+        # the slider only takes a different prefix of the same table
+        alerts = cached_alerts(fingerprint, results, alert_table, int(period_days), int(target_days))
+        max_cover = st.slider(
+            "Show products with at most this many days of cover",
+            min_value=0, max_value=180, value=int(target_days), key="alerts_max_cover"
         )
+        urgent = within_cover(alerts, max_cover)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Products", f"{len(urgent):,}")
+            st.metric("Out of stock", f"{(urgent['Urgency'] == 'Out of stock').sum():,}")
+        with col2:
+            st.metric("Critical", f"{(urgent['Urgency'] == 'Critical').sum():,}")
+            st.metric("Reorder Qty", f"{urgent['Reorder Qty'].sum():,}")
+        with col3:
+            st.metric("Reorder CP", f"₹{urgent['Reorder CP'].sum():,.2f}")
+            st.metric("Daily CP At Risk", f"₹{urgent['Daily CP At Risk'].sum():,.2f}")
+
+        paged_table(
+            urgent, f"alerts_{alert_table}",
+            filter_columns=("Urgency", "Brand", "Brand Manager"),
+            search_columns=tuple(ALERT_SPECS[alert_table][2]) + ("EasycomSKU",)
+        )
+        download_section(
+            urgent, f"{alert_table}_alerts", key=f"{alert_table}_alerts",
+            identity=(fingerprint, alert_table, int(period_days), int(target_days), max_cover)
+        )
+
+    with tab6:
+        st.header("Data Quality")
+        if reconciliation is None:
+            st.info("This snapshot was saved without data-quality checks.")
+        else:
+            st.caption("Per input: rows checked, values cleaning replaced with 0, product master rows "
+                       "dropped as duplicate ASIN / FNS (not included in Rows), and sold products the "
+                       "product master has no row for.")
+            st.dataframe(results["input_quality"], use_container_width=True, hide_index=True)
+            st.caption("Table totals against the totals taken straight from the business reports.")
+            st.dataframe(reconciliation, use_container_width=True, hide_index=True)
+
+    with tab7:
+        st.header("Sales History")
+        conn = history_connection()
+        today = datetime.date.today()
+        history_range = st.date_input(
+            "Date range",
+            value=(today - datetime.timedelta(days=90), today),
+            key="history_range"
+        )
+        if isinstance(history_range, (tuple, list)) and len(history_range) == 2:
+            start, end = history_range
+            col1, col2 = st.columns(2)
+            for col, channel in [(col1, "amazon"), (col2, "flipkart")]:
+                with col:
+                    st.subheader(channel.title())
+                    days = history.ingested_days(conn, channel)
+                    st.caption(f"{len(days):,} reports stored; each report's units are spread over "
+                               "the days it covers, and overlapping days are read from the newest")
+                    daily = history.daily_totals(conn, channel, start, end)
+                    if daily.empty:
+                        st.info("No stored sales in this range.")
+                        continue
+                    st.line_chart(daily)
+                    totals = history.sales_totals(conn, channel, start, end)
+                    paged_table(totals, f"history_{channel}", filter_columns=(),
+                                search_columns=(history.CHANNELS[channel][2],), height=400)
+
+    with tab8:
+        st.header("Stock Movement")
+        conn = history_connection()
+        movement_source = st.radio(
+            "Stock report", list(history.STOCK_SOURCES),
+            format_func=lambda kind: SCHEMAS[kind]["label"], horizontal=True, key="movement_source"
+        )
+        # Levels and running movement totals are built once per set of
+        # stored days; every range / product choice below is a lookup
+        movement = history.stock_movement(conn, movement_source)
+        if movement is None:
+            st.info("No stored days for this report yet. Tick \"Record these stock reports in history\" "
+                    "in the sidebar to store one per report date.")
+        else:
+            first, last = movement["dates"][0].date(), movement["dates"][-1].date()
+            st.caption(f"{len(movement['dates']):,} report days stored ({first:%d %b %Y} – {last:%d %b %Y}), "
+                       f"{len(movement['keys']):,} products")
+            if movement_source in history.STOCK_SALES:
+                st.caption("Units sold and velocities come from the stored "
+                           f"{history.STOCK_SALES[movement_source].title()} sales.")
+            else:
+                st.caption("Only stock levels are stored for this report: a net decrease is what left "
+                           "between uploads minus what arrived, so it under-counts sales.")
+            movement_range = st.date_input(
+                "Date range",
+                value=(max(first, last - datetime.timedelta(days=90)), last),
+                key="movement_range"
+            )
+            if isinstance(movement_range, (tuple, list)) and len(movement_range) == 2:
+                start, end = movement_range
+                key_name = history.STOCK_SOURCES[movement_source][2]
+                summary = history.movement_summary(movement, start, end, key_name, conn=conn)
+                picked = st.multiselect(
+                    "Chart these products (all when empty)", list(movement["keys"]), key="movement_keys"
+                )
+                series = history.movement_series(movement, start, end, picked or None, conn=conn)
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.line_chart(series[["Stock"]])
+                with col2:
+                    st.line_chart(series.drop(columns="Stock"))
+                paged_table(summary, f"movement_{movement_source}", filter_columns=(),
+                            search_columns=(key_name,), height=400)
+                download_section(summary, f"{movement_source}_movement", key=f"{movement_source}_movement",
+                                 identity=(movement["stored"], history.sales_signature(conn, movement_source),
+                                           start, end))
+
+    with tab9:
+        st.header("Brand Rollup")
+        # Totals per channel, Brand Manager and Brand are computed once per
+        # data set; every choice below regroups that small cube, not the tables
+        cube = cached_cube(fingerprint, results)
+        filters = {}
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            rollup_channel = st.selectbox("Channel", ["All channels"] + list(ROLLUP_CHANNELS), key="rollup_channel")
+        if rollup_channel != "All channels":
+            filters["Channel"] = rollup_channel
+        with col2:
+            managers = sorted(rollup(cube, ["Brand Manager"], filters)["Brand Manager"])
+            rollup_manager = st.selectbox("Brand Manager", ["All managers"] + managers, key="rollup_manager")
+        if rollup_manager != "All managers":
+            filters["Brand Manager"] = rollup_manager
+        with col3:
+            brands = sorted(rollup(cube, ["Brand"], filters)["Brand"])
+            rollup_brand = st.selectbox("Brand", ["All brands"] + brands, key="rollup_brand")
+        if rollup_brand != "All brands":
+            filters["Brand"] = rollup_brand
+        with col4:
+            rollup_measure = st.selectbox(
+                "Measure", ROLLUP_MEASURES, index=ROLLUP_MEASURES.index("CP As Per Qty"), key="rollup_measure"
+            )
+
+        # Break the selection down one level below the deepest choice
+        level = next((lvl for lvl in ["Brand Manager", "Brand", "Channel"] if lvl not in filters), "Channel")
+        totals = rollup(cube, [level], filters)
+        cols = st.columns(len(ROLLUP_MEASURES))
+        for col, column in zip(cols, ROLLUP_MEASURES):
+            col.metric(column, f"{totals[column].sum():,.0f}")
+        if level == "Channel":
+            st.bar_chart(totals.set_index("Channel")[rollup_measure])
+        else:
+            by_channel = rollup(cube, [level, "Channel"], filters).pivot(
+                index=level, columns="Channel", values=rollup_measure
+            )
+            st.bar_chart(by_channel)
+        st.dataframe(totals, use_container_width=True, hide_index=True)
+        download_section(totals, f"rollup_by_{level.replace(' ', '_').lower()}", key="brand_rollup",
+                         identity=(fingerprint, "rollup", level, tuple(filters.items())))
+
+        if "Brand" in filters:
+            # Only the chosen brand's products are read from the detail tables
+            for channel, (table, _) in ROLLUP_CHANNELS.items():
+                if filters.get("Channel", channel) != channel:
+                    continue
+                st.subheader(f"{channel} products")
+                paged_table(detail_rows(results[table], filters), f"rollup_{table}", filter_columns=(), height=300)
+
+    if show_diagnostics:
+        show_diagnostics_panel()
+
+    if building is not None:
+        watch_job(building, progress_bar)
+        st.rerun()
 
 else:
     st.info("👈 Please upload all required files from the sidebar to begin analysis.")
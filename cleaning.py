@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# Tokens stripped before parsing numbers
+THOUSANDS = (",",)
+CURRENCY = ("₹", ",", "--")
+
+_NAN = float("nan")
+# What pd.to_numeric accepts once the tokens are stripped, ASCII digits only
+_NUMBER = r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"
+
+
+def _cell_parser(remove):
+    def parse(value):
+        if isinstance(value, str):
+            for token in remove:
+                value = value.replace(token, "")
+            # float() would accept "1_000"; pandas does not
+            if "_" in value:
+                return _NAN
+            try:
+                return float(value)
+            except ValueError:
+                return _NAN
+        if value is None or isinstance(value, bool):
+            return _NAN
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return _NAN
+    return parse
+
+
+def _count_missing(values, remove, counts):
+    # Only the cells that became NaN are looked at again
+    blank = 0
+    for value in values:
+        if isinstance(value, str):
+            for token in remove:
+                value = value.replace(token, "")
+            blank += not value.strip()
+        else:
+            blank += value is None or value != value
+    counts["blank"] += blank
+    counts["unparsed"] += len(values) - blank
+
+
+def _parse_text(text, remove, counts):
+    # Vectorised: each step runs over the whole column in pandas' string
+    # engine (Arrow when installed) instead of per cell in Python
+    for token in remove:
+        text = text.str.replace(token, "", regex=False)
+    text = text.str.strip()
+    valid = text.str.fullmatch(_NUMBER).fillna(False).to_numpy(dtype=bool)
+    numbers = text.where(valid)
+    if getattr(text.dtype, "storage", None) == "pyarrow":
+        # Arrow casts the strings in C++; the object route parses each one
+        numbers = numbers.astype("float64[pyarrow]")
+    parsed = numbers.to_numpy(dtype="float64", na_value=_NAN)
+    if counts is not None and not valid.all():
+        blank = int((text.isna() | text.eq("")).sum())
+        counts["blank"] += blank
+        counts["unparsed"] += int((~valid).sum()) - blank
+    return parsed
+
+
+def coerce_numeric(series, remove=THOUSANDS, counts=None):
+    """Parse a column of report numbers ("1,200", " 35 ", "₹1,499") to floats/ints.
+
+    Same result as ``.astype(str)``, one ``str.replace`` per token,
+    ``str.strip()`` and ``pd.to_numeric(errors="coerce").fillna(0)``
+    (except that "inf" / "nan" spellings count as unparsed), but columns
+    that are already numeric are only NaN-filled. Text columns go through
+    vectorised string operations; object columns mixing numbers and text
+    (Excel cells) are parsed in a single pass over the values instead, as
+    converting every number to a string first costs more than it saves.
+
+    If ``counts`` (a dict) is given, ``counts["blank"]`` and
+    ``counts["unparsed"]`` are increased by the number of empty cells and
+    of values that are not numbers; both become 0.
+    """
+    if counts is not None:
+        counts.setdefault("blank", 0)
+        counts.setdefault("unparsed", 0)
+
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        if counts is not None:
+            counts["blank"] += int(series.isna().sum())
+        return series.fillna(0)
+
+    if pd.api.types.infer_dtype(series, skipna=True) == "string":
+        parsed = _parse_text(series.astype("str"), remove, counts)
+        missing = np.isnan(parsed)
+    else:
+        values = series.to_numpy(dtype=object)
+        parsed = np.fromiter(map(_cell_parser(tuple(remove)), values), dtype="float64", count=len(values))
+        missing = np.isnan(parsed)
+        if counts is not None and missing.any():
+            _count_missing(values[missing], remove, counts)
+
+    if missing.any():
+        parsed[missing] = 0
+    elif np.isfinite(parsed).all() and np.array_equal(parsed, np.trunc(parsed)):
+        # Keep integer columns integer, as to_numeric on clean strings would
+        parsed = parsed.astype("int64")
+    return pd.Series(parsed, index=series.index, name=series.name)
+
+
+def coerce_numeric_columns(df, columns, remove=THOUSANDS, counts=None):
+    """Clean several numeric columns of ``df`` in place and return it."""
+    for column in columns:
+        df[column] = coerce_numeric(df[column], remove, counts)
+    return df
+
+
+def transform_text(series, func):
+    """Apply a vectorised string transform (``func(values) -> values``) to a
+    text column.
+
+    For categoricals only the distinct values are transformed and the row
+    codes remapped, merging categories the transform makes equal; the
+    result stays categorical with sorted categories.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return func(series)
+    categories = pd.Series(func(pd.Series(series.cat.categories)).to_numpy(dtype=object))
+    new_codes, uniques = pd.factorize(categories, sort=True)
+    codes = series.cat.codes.to_numpy()
+    remapped = np.where(codes >= 0, new_codes[codes], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(remapped, categories=pd.Index(uniques)),
+        index=series.index, name=series.name,
+    )
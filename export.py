@@ -0,0 +1,67 @@
+import hashlib
+import importlib.util
+import io
+
+import pandas as pd
+
+from cache import LRUCache
+
+# format -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+}
+if importlib.util.find_spec("pyarrow"):
+    EXPORT_FORMATS["Parquet"] = ("parquet", "application/vnd.apache.parquet")
+
+# Generated files, keyed on (table identity or content fingerprint, format)
+export_cache = LRUCache(max_entries=16, max_bytes=512 * 1024 ** 2)
+
+
+def frame_fingerprint(df):
+    """Content hash of a table (values, column names and order)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def to_excel_bytes(df):
+    buffer = io.BytesIO()
+    if importlib.util.find_spec("xlsxwriter"):
+        # Not constant_memory: pandas writes cells column by column, and in
+        # that mode xlsxwriter drops every cell behind the current row
+        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False)
+    else:
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            df.to_excel(writer, index=False)
+    return buffer.getvalue()
+
+
+def to_bytes(df, fmt):
+    if fmt == "Excel":
+        return to_excel_bytes(df)
+    if fmt == "CSV":
+        return df.to_csv(index=False).encode("utf-8-sig")
+    if fmt == "Parquet":
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def cached_export(df, fmt, fingerprint=None):
+    """Previously generated file for this table + format, or None.
+
+    ``fingerprint`` is any hashable that identifies the table's content
+    (e.g. the input fingerprint plus the table and view settings); the
+    table is only hashed when none is given.
+    """
+    return export_cache.get((fingerprint or frame_fingerprint(df), fmt))
+
+
+def export(df, fmt, fingerprint=None):
+    """Generate (or reuse) the file for this table in the given format."""
+    key = (fingerprint or frame_fingerprint(df), fmt)
+    return export_cache.get_or_create(key, lambda: to_bytes(df, fmt))
@@ -0,0 +1,419 @@
+import datetime
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache
+
+# Local store of per-product sales and daily stock, so multi-month views are
+# a query over stored aggregates instead of re-uploading old reports.
+HISTORY_DB = os.environ.get(
+    "STOCK_MOVEMENT_HISTORY_DB",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "stock_movement", "history.sqlite"),
+)
+
+# channel -> (table, key column, pivot key column, pivot value column)
+CHANNELS = {
+    "amazon": ("amazon_sales", "asin", "(Parent) ASIN", "Total Orders"),
+    "flipkart": ("flipkart_sales", "product_id", "Product Id", "Final Sale Units"),
+}
+
+# stock report -> (table, key column, report key column, report quantity column)
+STOCK_SOURCES = {
+    "qwtt_inventory": ("qwtt_stock", "asin", "Asin", "Sellable"),
+    "amazon_stock": ("amazon_fba_stock", "asin", "asin", "afn-warehouse-quantity"),
+    "flipkart_inventory": ("flipkart_stock", "sku", "sku", "old_quantity"),
+}
+
+# Stock reports keyed like a channel's stored sales (QWTT Asin is the
+# (Parent) ASIN the Amazon tables join on): their movement view reads units
+# sold from those sales. The others only have net stock decreases between
+# uploads, which under-count sales whenever stock arrives in between.
+STOCK_SALES = {"qwtt_inventory": "amazon"}
+
+# Days a business report's sales cover, ending on its report date, unless
+# told otherwise (the Reorder Alerts' default sales period too)
+REPORT_PERIOD_DAYS = 30
+
+# Trailing windows (days) of the movement view's velocities
+VELOCITY_WINDOWS = (7, 30)
+
+# Movement arrays per stock report and set of stored days
+movement_cache = LRUCache(max_entries=8, max_bytes=512 * 1024 ** 2)
+
+# The app shares one connection across session threads; every read and
+# write below holds this so two sessions never interleave statements
+_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS amazon_sales (
+    report_date TEXT NOT NULL,
+    asin TEXT NOT NULL,
+    units REAL NOT NULL,
+    PRIMARY KEY (report_date, asin)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS flipkart_sales (
+    report_date TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    units REAL NOT NULL,
+    PRIMARY KEY (report_date, product_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS qwtt_stock (
+    report_date TEXT NOT NULL,
+    asin TEXT NOT NULL,
+    units REAL NOT NULL,
+    PRIMARY KEY (report_date, asin)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS amazon_fba_stock (
+    report_date TEXT NOT NULL,
+    asin TEXT NOT NULL,
+    units REAL NOT NULL,
+    PRIMARY KEY (report_date, asin)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS flipkart_stock (
+    report_date TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    units REAL NOT NULL,
+    PRIMARY KEY (report_date, sku)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingested (
+    channel TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL,
+    period_days INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (channel, report_date)
+);
+"""
+
+
+def connect(path=None):
+    path = path or HISTORY_DB
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    if "period_days" not in [row[1] for row in conn.execute("PRAGMA table_info(ingested)")]:
+        # Stores made before report windows were recorded held each upload
+        # as a single day
+        conn.execute("ALTER TABLE ingested ADD COLUMN period_days INTEGER NOT NULL DEFAULT 1")
+    return conn
+
+
+def _day(value):
+    if isinstance(value, (datetime.date, datetime.datetime, pd.Timestamp)):
+        return value.strftime("%Y-%m-%d")
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def ingest_sales(conn, channel, report_date, sales_pivot, source_hash, period_days=REPORT_PERIOD_DAYS):
+    """Store one business report's per-product sales for a channel.
+
+    The report covers the ``period_days`` days ending on ``report_date``
+    (see sales_totals for how overlapping reports are read back).
+    Re-ingesting the same file for the same date and window is a no-op; a
+    different one for an already stored date replaces it. Returns True if
+    rows were written.
+    """
+    table, key, pivot_key, pivot_value = CHANNELS[channel]
+    # Collapse to one row per product before writing
+    daily = sales_pivot.groupby(pivot_key, sort=False)[pivot_value].sum()
+    return _store_day(conn, channel, table, key, report_date, daily, source_hash, int(period_days))
+
+
+def ingest_stock(conn, source, report_date, report, source_hash):
+    """Store one day's per-product stock from a loaded stock report
+    (``source`` is a key of STOCK_SOURCES), like ingest_sales()."""
+    table, key, report_key, quantity = STOCK_SOURCES[source]
+    daily = report.groupby(report_key, sort=False, observed=True)[quantity].sum()
+    # Same key normalisation as the tables (ASINs upper-cased), which can
+    # merge keys, so sum again
+    keys = daily.index.astype(str).str.strip()
+    if key == "asin":
+        keys = keys.str.upper()
+    daily = daily.groupby(keys, sort=False).sum()
+    return _store_day(conn, source, table, key, report_date, daily, source_hash)
+
+
+def _store_day(conn, channel, table, key, report_date, daily, source_hash, period_days=1):
+    day = _day(report_date)
+    rows = zip(
+        [day] * len(daily),
+        daily.index.astype(str),
+        daily.to_numpy(dtype="float64"),
+    )
+    with _lock:
+        seen = conn.execute(
+            "SELECT source_hash, period_days FROM ingested WHERE channel = ? AND report_date = ?",
+            (channel, day),
+        ).fetchone()
+        if seen is not None and tuple(seen) == (source_hash, period_days):
+            return False
+        with conn:
+            conn.execute(f"DELETE FROM {table} WHERE report_date = ?", (day,))
+            conn.executemany(f"INSERT INTO {table} (report_date, {key}, units) VALUES (?, ?, ?)", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested "
+                "(channel, report_date, source_hash, rows, ingested_at, period_days) VALUES (?, ?, ?, ?, ?, ?)",
+                (channel, day, source_hash, len(daily),
+                 datetime.datetime.now().isoformat(timespec="seconds"), period_days),
+            )
+    return True
+
+
+def _query(sql, conn, params):
+    with _lock:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def _stored(conn, channel):
+    # Changes whenever a report of this channel is stored or replaced
+    with _lock:
+        return tuple(conn.execute(
+            "SELECT report_date, source_hash, period_days FROM ingested WHERE channel = ? ORDER BY report_date",
+            (channel,),
+        ).fetchall())
+
+
+def ingested_days(conn, channel):
+    return _query(
+        "SELECT report_date, period_days, rows, ingested_at FROM ingested WHERE channel = ? ORDER BY report_date",
+        conn, (channel,),
+    )
+
+
+def _coverage(conn, channel, start, end):
+    """The stored report each day of ``start``..``end`` is read from: the
+    latest one whose window covers it (NaT where none does). Returns
+    (days, report date per day, {report date: period_days})."""
+    reports = ingested_days(conn, channel)
+    days = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq="D")
+    owner = np.full(len(days), np.datetime64("NaT"), dtype="datetime64[ns]")
+    # Oldest first, so a newer report overwrites the days it shares
+    for report_date, period_days in zip(pd.to_datetime(reports["report_date"]), reports["period_days"]):
+        covered = (days <= report_date) & (days > report_date - pd.Timedelta(days=int(period_days)))
+        owner[covered] = report_date.to_datetime64()
+    periods = dict(zip(pd.to_datetime(reports["report_date"]), reports["period_days"]))
+    return days, pd.DatetimeIndex(owner), periods
+
+
+def sales_totals(conn, channel, start, end):
+    """Per-product units over ``start``..``end`` (inclusive).
+
+    A report's units are spread evenly over the days it covers, and a day
+    covered by several reports is read from the latest; so daily uploads
+    of rolling 30-day reports add up to the same as one report per month.
+    ``Days`` is the number of covered days in the range the product was
+    listed on.
+    """
+    table, key, pivot_key, pivot_value = CHANNELS[channel]
+    days, owner, periods = _coverage(conn, channel, start, end)
+    shares = pd.Series(owner[owner.notna()]).value_counts()
+    if shares.empty:
+        return pd.DataFrame(columns=[pivot_key, pivot_value, "Days"])
+    weights = ", ".join(["(?, ?, ?)"] * len(shares))
+    params = []
+    for report_date, covered in shares.items():
+        params += [_day(report_date), covered / periods[report_date], int(covered)]
+    totals = _query(
+        f"WITH w(report_date, weight, days) AS (VALUES {weights}) "
+        f"SELECT {key} AS key, ROUND(SUM(units * weight), 2) AS units, SUM(days) AS days "
+        f"FROM {table} JOIN w USING (report_date) GROUP BY {key} ORDER BY units DESC",
+        conn, tuple(params),
+    )
+    return totals.rename(columns={"key": pivot_key, "units": pivot_value, "days": "Days"})
+
+
+def daily_totals(conn, channel, start, end, keys=None):
+    """Total units per day over ``start``..``end`` (inclusive) for the days
+    a stored report covers: its units / the days it covers. ``keys``
+    limits the total to those products."""
+    table, key, _, pivot_value = CHANNELS[channel]
+    days, owner, periods = _coverage(conn, channel, start, end)
+    covered = owner.notna()
+    if not covered.any():
+        return pd.DataFrame(columns=[pivot_value], index=pd.DatetimeIndex([], name="report_date"))
+    reports = sorted(set(owner[covered]))
+    params = [_day(report_date) for report_date in reports]
+    where = f"report_date IN ({', '.join('?' * len(reports))})"
+    if keys is not None:
+        params += [str(k) for k in keys]
+        where += f" AND {key} IN ({', '.join('?' * len(keys))})"
+    totals = _query(
+        f"SELECT report_date, SUM(units) AS units FROM {table} WHERE {where} GROUP BY report_date",
+        conn, tuple(params),
+    )
+    per_day = pd.Series(totals["units"].to_numpy(), index=pd.to_datetime(totals["report_date"]))
+    per_day = per_day / pd.Series(periods).reindex(per_day.index)
+    return pd.DataFrame(
+        # A covering report without these products sold none of them
+        {pivot_value: per_day.reindex(owner[covered]).fillna(0).to_numpy()},
+        index=pd.DatetimeIndex(days[covered], name="report_date"),
+    )
+
+
+# =============================
+# STOCK MOVEMENT
+# =============================
+
+def stock_movement(conn, source):
+    """Stock levels and cumulative movement per product for one stock report,
+    at every stored report date; None if no day is stored.
+
+    Returns ``{"dates", "keys", "stock", "cum_out", "cum_in", "stored"}``: ``stock``
+    is dates x keys (a product missing from a day's report had none),
+    ``cum_out`` / ``cum_in`` the running totals of decreases / increases
+    since the first date, ``stored`` the (source, stored days) it was built
+    from. Any window's movement is then two row lookups (see
+    movement_summary / movement_series). Cached until a day of that report
+    is stored or replaced.
+    """
+    stored = _stored(conn, source)
+    if not stored:
+        return None
+    return movement_cache.get_or_create((source, stored), lambda: _build_movement(conn, source, stored))
+
+
+def _build_movement(conn, source, stored):
+    table, key, _, _ = STOCK_SOURCES[source]
+    rows = _query(f"SELECT report_date, {key} AS key, units FROM {table}", conn, ())
+    date_codes, dates = pd.factorize(pd.to_datetime(rows["report_date"]), sort=True)
+    key_codes, keys = pd.factorize(rows["key"], sort=True)
+
+    stock = np.zeros((len(dates), len(keys)), dtype="float64")
+    stock[date_codes, key_codes] = rows["units"].to_numpy()
+    change = np.diff(stock, axis=0, prepend=stock[:1])
+    return {
+        "dates": pd.DatetimeIndex(dates),
+        "keys": pd.Index(keys),
+        "stock": stock,
+        "cum_out": np.cumsum(np.clip(-change, 0, None), axis=0),
+        "cum_in": np.cumsum(np.clip(change, 0, None), axis=0),
+        "stored": (source, stored),
+    }
+
+
+def _as_of(movement, days):
+    # Row of the last stored date on or before each day; -1 before the first
+    return np.searchsorted(movement["dates"].to_numpy(), pd.DatetimeIndex(days).to_numpy(), side="right") - 1
+
+
+def _total_until(cumulative, rows):
+    # cumulative[rows] with "before the first date" as 0
+    return np.where((rows >= 0)[:, None], cumulative[np.maximum(rows, 0)], 0.0)
+
+
+def sales_signature(conn, source):
+    """The stored sales a stock report's movement view reads (empty when it
+    reads none, see STOCK_SALES); changes whenever those sales do."""
+    channel = STOCK_SALES.get(source)
+    return _stored(conn, channel) if channel else ()
+
+
+def _units_sold(conn, channel, keys, start, end):
+    # Units sold of each key over start..end, and how many of those days a
+    # stored report covers
+    _, _, pivot_key, pivot_value = CHANNELS[channel]
+    totals = sales_totals(conn, channel, start, end)
+    sold = totals.set_index(pivot_key)[pivot_value].reindex(keys).fillna(0).to_numpy(dtype="float64")
+    _, owner, _ = _coverage(conn, channel, start, end)
+    return sold, int(owner.notna().sum())
+
+
+def movement_summary(movement, start, end, key_name="Key", conn=None):
+    """Per product over ``start``..``end``: opening / closing stock, net
+    stock decrease and increase, trailing rates (per day, as of ``end``),
+    the share of stock that went and days of cover at the 30-day rate.
+
+    With ``conn``, a report in STOCK_SALES takes units sold from the stored
+    sales: velocities, sell-through and cover are then about sales. The
+    others only have net stock decreases, and their columns say so.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    first = movement["dates"][0]
+    # Opening stock is the last report before the range (or its first day)
+    rows = _as_of(movement, [max(start - pd.Timedelta(days=1), first), end])
+
+    opening, closing = _total_until(movement["stock"], rows)
+    out_before, out_end = _total_until(movement["cum_out"], rows)
+    in_before, in_end = _total_until(movement["cum_in"], rows)
+    decrease, increase = out_end - out_before, in_end - in_before
+
+    summary = pd.DataFrame({
+        key_name: movement["keys"],
+        "Opening Stock": opening,
+        "Closing Stock": closing,
+        "Net Change": closing - opening,
+        "Net Stock Decrease": decrease,
+        "Net Stock Increase": increase,
+    })
+    channel = STOCK_SALES.get(movement["stored"][0]) if conn is not None else None
+    if channel is None:
+        units, available = decrease, opening + increase
+        rate, share, cover = "Net Decrease/Day {}d", "Net Decrease %", "Days of Cover (Net Decrease)"
+        window_rows = _as_of(movement, [end - pd.Timedelta(days=window) for window in VELOCITY_WINDOWS])
+        rates = [
+            (out_end - window_out) / window
+            for window, window_out in zip(VELOCITY_WINDOWS, _total_until(movement["cum_out"], window_rows))
+        ]
+    else:
+        units = summary["Units Sold"] = _units_sold(conn, channel, movement["keys"], start, end)[0]
+        # Sold out of what there was: what is left plus what went
+        available = closing + units
+        rate, share, cover = "Velocity {}d", "Sell-Through %", "Days of Cover"
+        rates = []
+        for window in VELOCITY_WINDOWS:
+            sold, covered = _units_sold(conn, channel, movement["keys"], end - pd.Timedelta(days=window - 1), end)
+            rates.append(sold / covered if covered else np.full(len(sold), np.nan))
+
+    for window, values in zip(VELOCITY_WINDOWS, rates):
+        summary[rate.format(window)] = values.round(2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summary[share] = np.where(available > 0, units / available * 100, np.nan).round(1)
+        velocity = rates[-1]
+        summary[cover] = np.where(
+            velocity > 0, closing / velocity, np.where(np.isnan(velocity), np.nan, np.inf)
+        ).round(1)
+    return summary
+
+
+def movement_series(movement, start, end, keys=None, conn=None):
+    """Calendar-day series over ``start``..``end`` of stock and trailing
+    rates, summed over ``keys`` (all products when None). The rates are
+    sales velocities for a report in STOCK_SALES when ``conn`` is given,
+    net stock decreases otherwise (see movement_summary)."""
+    days = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq="D")
+    if keys is None:
+        columns = slice(None)
+    else:
+        columns = movement["keys"].get_indexer(list(keys))
+        columns = columns[columns >= 0]
+    stock = movement["stock"][:, columns].sum(axis=1)
+    cum_out = movement["cum_out"][:, columns].sum(axis=1)
+
+    rows = _as_of(movement, days)
+    series = pd.DataFrame(index=days)
+    series["Stock"] = np.where(rows >= 0, stock[np.maximum(rows, 0)], np.nan)
+
+    channel = STOCK_SALES.get(movement["stored"][0]) if conn is not None else None
+    if channel is not None:
+        # Units sold per covered day, averaged over each trailing window
+        lookback = days[0] - pd.Timedelta(days=max(VELOCITY_WINDOWS) - 1)
+        picked = None if keys is None else list(movement["keys"][columns])
+        daily = daily_totals(conn, channel, lookback, days[-1], picked).iloc[:, 0]
+        daily = daily.reindex(pd.date_range(lookback, days[-1], freq="D"))
+        for window in VELOCITY_WINDOWS:
+            series[f"Velocity {window}d"] = daily.rolling(window, min_periods=1).mean().reindex(days).to_numpy()
+        return series
+
+    out_now = np.where(rows >= 0, cum_out[np.maximum(rows, 0)], 0.0)
+    for window in VELOCITY_WINDOWS:
+        window_rows = _as_of(movement, days - pd.Timedelta(days=window))
+        window_out = np.where(window_rows >= 0, cum_out[np.maximum(window_rows, 0)], 0.0)
+        series[f"Net Decrease/Day {window}d"] = (out_now - window_out) / window
+    return series
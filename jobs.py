@@ -0,0 +1,84 @@
+import threading
+import time
+
+
+class Cancelled(Exception):
+    """Raised inside a job's work at its next progress report after cancel()."""
+
+
+class Job:
+    """Runs ``func(job)`` in a background thread.
+
+    The work reports where it is with ``job.progress(text, done, total)``,
+    which is also where cancellation takes effect: once cancel() is called
+    the next report raises Cancelled and the job ends without a result.
+    ``result`` / ``error`` are only set once the work has returned, so a
+    reader sees either nothing or the complete result.
+
+    ``key`` identifies the inputs the job was started for (e.g. an input
+    fingerprint); ``stats`` is free for the work to record figures in.
+    """
+
+    def __init__(self, key, func):
+        self.key = key
+        self.stats = {}
+        self.text = "Starting"
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.started = time.monotonic()
+        self.ended = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(func,), name=f"job-{key}", daemon=True)
+        self._thread.start()
+
+    def _run(self, func):
+        try:
+            result = func(self)
+        except Cancelled:
+            pass
+        except Exception as e:  # handed to whoever displays the job
+            self.error = e
+        else:
+            self.result = result
+        finally:
+            self.ended = time.monotonic()
+            self._finished.set()
+
+    def progress(self, text, done=None, total=None):
+        if self._cancel.is_set():
+            raise Cancelled()
+        with self._lock:
+            self.text = text
+            if done is not None:
+                self.done = done
+            if total is not None:
+                self.total = total
+
+    def status(self):
+        """(text, fraction done or None) as of the last progress report."""
+        with self._lock:
+            fraction = None if not self.total else min(self.done / self.total, 1.0)
+            return self.text, fraction
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def seconds(self):
+        return (self.ended or time.monotonic()) - self.started
+
+    def wait(self, timeout=None):
+        """Block until the job ends or ``timeout`` passes; True if it ended."""
+        return self._finished.wait(timeout)
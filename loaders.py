@@ -0,0 +1,421 @@
+import hashlib
+import importlib.util
+import io
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+import pm_index
+from cache import LRUCache
+from cleaning import CURRENCY, coerce_numeric, coerce_numeric_columns, transform_text
+from schemas import enforce_schema, read_options
+
+# Parsed + cleaned reports, keyed on (report kind, content hash, parser options).
+# Lives at module level so it survives Streamlit reruns.
+CACHE_MAX_ENTRIES = 32
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+report_cache = LRUCache(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES)
+
+# Excel reader: "auto" uses the Rust-backed calamine reader when
+# python-calamine is installed and falls back to openpyxl otherwise.
+EXCEL_ENGINES = ["auto", "calamine", "openpyxl"]
+EXCEL_ENGINE = os.environ.get("STOCK_MOVEMENT_EXCEL_ENGINE", "auto")
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def resolve_excel_engine(engine=None):
+    engine = engine or EXCEL_ENGINE
+    if engine == "auto":
+        engine = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+    return engine
+
+
+def _read_excel(data, sheet_name, engine, options):
+    with pd.ExcelFile(io.BytesIO(data), engine=engine) as workbook:
+        if sheet_name not in workbook.sheet_names:
+            sheet_name = 0
+        return workbook.parse(sheet_name, **options)
+
+
+def read_excel(data, sheet_name=0, engine=None, **options):
+    engine = resolve_excel_engine(engine)
+    try:
+        return _read_excel(data, sheet_name, engine, options)
+    except Exception as exc:
+        if engine == "openpyxl":
+            raise
+        warnings.warn(f"{engine} could not read workbook ({exc}); falling back to openpyxl")
+        return _read_excel(data, sheet_name, "openpyxl", options)
+
+
+def read_report(kind, data, is_csv, engine=None, sheet_name=0):
+    """Read one report applying its declared schema (see schemas.SCHEMAS)."""
+    options = read_options(kind)
+    if is_csv:
+        df = pd.read_csv(io.BytesIO(data), **options)
+    else:
+        df = read_excel(data, sheet_name=sheet_name, engine=engine, **options)
+    return enforce_schema(kind, df)
+
+
+# =============================
+# READ + CLEAN PER REPORT
+# =============================
+
+def load_qwtt_inventory(data, is_csv, engine=None):
+    Qwtt_Inventory = read_report("qwtt_inventory", data, is_csv, engine)
+    quality = Qwtt_Inventory.attrs["quality"] = {"rows": len(Qwtt_Inventory)}
+    Qwtt_Inventory["Sellable"] = coerce_numeric(Qwtt_Inventory["Sellable"], counts=quality)
+    return Qwtt_Inventory
+
+
+def clean_amazon_stock(Amazon_Stock):
+    quality = Amazon_Stock.attrs["quality"] = {"rows": len(Amazon_Stock)}
+    Amazon_Stock["afn-warehouse-quantity"] = coerce_numeric(
+        Amazon_Stock["afn-warehouse-quantity"], counts=quality
+    )
+    return Amazon_Stock
+
+
+def load_amazon_stock(data, is_csv=True, engine=None):
+    return clean_amazon_stock(read_report("amazon_stock", data, True))
+
+
+def load_flipkart_business(data, is_csv=False, engine=None):
+    Flipkart_Business_Report = read_report("flipkart_business", data, False, engine)
+    quality = Flipkart_Business_Report.attrs["quality"] = {"rows": len(Flipkart_Business_Report)}
+    Flipkart_Business_Report["Final Sale Units"] = coerce_numeric(
+        Flipkart_Business_Report["Final Sale Units"], counts=quality
+    )
+    negative = Flipkart_Business_Report["Final Sale Units"] < 0
+    quality["negative"] = int(negative.sum())
+    Flipkart_Business_Report.loc[negative, "Final Sale Units"] = 0
+    return Flipkart_Business_Report
+
+
+def load_amazon_business(data, is_csv, engine=None):
+    # Read the specific sheet for Amazon Business Report if it exists
+    Amazon_Business_Report = read_report(
+        "amazon_business", data, is_csv, engine,
+        sheet_name='BusinessReport-AMAZON'
+    )
+
+    # Ensure numeric columns (handles CSV + Excel safely)
+    quality = Amazon_Business_Report.attrs["quality"] = {"rows": len(Amazon_Business_Report)}
+    coerce_numeric_columns(
+        Amazon_Business_Report, ["Total Order Items", "Total Order Items - B2B"], counts=quality
+    )
+    Amazon_Business_Report["Total Orders"] = (
+        Amazon_Business_Report["Total Order Items"] +
+        Amazon_Business_Report["Total Order Items - B2B"]
+    )
+    return Amazon_Business_Report
+
+
+def load_amazon_pm(data, is_csv=False, engine=None):
+    Amazon_PM = read_report("amazon_pm", data, False, engine)
+
+    # Clean and standardize columns
+    Amazon_PM["ASIN"] = Amazon_PM["ASIN"].astype(str).str.strip().str.upper()
+    Amazon_PM["Vendor SKU Codes"] = Amazon_PM["Vendor SKU Codes"].astype(str).str.strip()
+    Amazon_PM["EasycomSKU"] = Amazon_PM["EasycomSKU"].astype(str).str.strip()
+
+    # Remove duplicates from Amazon PM to prevent expansion during merge
+    # Priority sort: Rows with EasycomSKU and CP come first
+    Amazon_PM["EasycomSKU_Clean"] = Amazon_PM["EasycomSKU"].astype(str).replace(["nan", ""], pd.NA)
+    rows = len(Amazon_PM)
+    Amazon_PM = (
+        Amazon_PM.sort_values(by=["EasycomSKU_Clean", "CP"], na_position='last', ascending=[True, False])
+        .drop_duplicates(subset=['ASIN'])
+        .drop(columns=["EasycomSKU_Clean"])
+    )
+    # Rows counted after de-duplication, like the CP counts below
+    quality = Amazon_PM.attrs["quality"] = {"rows": len(Amazon_PM), "duplicate_keys": rows - len(Amazon_PM)}
+
+    # Ensure numeric CP
+    Amazon_PM["CP"] = coerce_numeric(Amazon_PM["CP"], remove=CURRENCY, counts=quality)
+    return Amazon_PM
+
+
+def load_flipkart_pm(data, is_csv=False, engine=None):
+    Flipkart_PM = read_report("flipkart_pm", data, False, engine)
+    Flipkart_PM["FNS"] = Flipkart_PM["FNS"].astype(str).str.strip().str.upper()
+    Flipkart_PM["EasycomSKU"] = Flipkart_PM["EasycomSKU"].astype(str).str.strip()
+
+    # Remove duplicates from Flipkart PM
+    # Priority sort: Rows with EasycomSKU and CP come first
+    Flipkart_PM["EasycomSKU_Clean"] = Flipkart_PM["EasycomSKU"].astype(str).replace(["nan", ""], pd.NA)
+    rows = len(Flipkart_PM)
+    Flipkart_PM = (
+        Flipkart_PM.sort_values(by=["EasycomSKU_Clean", "CP"], na_position='last', ascending=[True, False])
+        .drop_duplicates(subset=['FNS'])
+        .drop(columns=["EasycomSKU_Clean"])
+    )
+    quality = Flipkart_PM.attrs["quality"] = {"rows": len(Flipkart_PM), "duplicate_keys": rows - len(Flipkart_PM)}
+
+    # Ensure numeric CP
+    Flipkart_PM["CP"] = coerce_numeric(Flipkart_PM["CP"], remove=CURRENCY, counts=quality)
+    return Flipkart_PM
+
+
+def clean_flipkart_inventory(Flipkart_Easycom_Inventory):
+    quality = Flipkart_Easycom_Inventory.attrs["quality"] = {"rows": len(Flipkart_Easycom_Inventory)}
+    Flipkart_Easycom_Inventory["old_quantity"] = coerce_numeric(
+        Flipkart_Easycom_Inventory["old_quantity"], counts=quality
+    )
+    Flipkart_Easycom_Inventory["sku"] = transform_text(
+        Flipkart_Easycom_Inventory["sku"], lambda sku: sku.str.replace(r"^`", "", regex=True)
+    )
+    return Flipkart_Easycom_Inventory
+
+
+def load_flipkart_inventory(data, is_csv=True, engine=None):
+    return clean_flipkart_inventory(read_report("flipkart_inventory", data, True))
+
+
+LOADERS = {
+    "qwtt_inventory": load_qwtt_inventory,
+    "amazon_stock": load_amazon_stock,
+    "flipkart_business": load_flipkart_business,
+    "amazon_business": load_amazon_business,
+    "amazon_pm": load_amazon_pm,
+    "flipkart_pm": load_flipkart_pm,
+    "flipkart_inventory": load_flipkart_inventory,
+}
+
+
+# =============================
+# STREAMED CSV REPORTS
+# =============================
+
+# The tables only use per-key sums of these reports, so files above
+# STREAM_MIN_BYTES are read STREAM_CHUNK_ROWS at a time and reduced to
+# kind -> (key column, summed column, per-chunk cleaner) as they go.
+STREAMED_SUMS = {
+    "amazon_stock": ("asin", "afn-warehouse-quantity", clean_amazon_stock),
+    "flipkart_inventory": ("sku", "old_quantity", clean_flipkart_inventory),
+}
+STREAM_MIN_BYTES = int(os.environ.get("STOCK_MOVEMENT_STREAM_MIN_BYTES", 256 * 1024 ** 2))
+STREAM_CHUNK_ROWS = int(os.environ.get("STOCK_MOVEMENT_STREAM_CHUNK_ROWS", 250_000))
+STREAM_ENGINE = "csv stream"
+
+
+def use_streaming(kind, size):
+    return kind in STREAMED_SUMS and size >= STREAM_MIN_BYTES
+
+
+def stream_report_sums(kind, source, chunk_rows=None):
+    """Per-key sums of a CSV report, read in chunks so memory is bounded by
+    the number of distinct keys rather than the file size.
+
+    ``source`` is the file's bytes or a path. Returns one row per key with
+    the same columns and cleaning as the whole-file loader, in order of
+    first appearance; its ``attrs["quality"]`` totals every chunk's counts.
+    """
+    key, value, clean = STREAMED_SUMS[kind]
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    totals = None
+    quality = {"rows": 0}
+    with pd.read_csv(source, chunksize=chunk_rows or STREAM_CHUNK_ROWS, **read_options(kind)) as reader:
+        for chunk in reader:
+            chunk = clean(enforce_schema(kind, chunk))
+            for name, count in chunk.attrs["quality"].items():
+                quality[name] = quality.get(name, 0) + count
+            partial = chunk.groupby(key, sort=False, observed=True)[value].sum()
+            # Every chunk has its own categories, so partials are merged on the strings
+            partial.index = partial.index.astype(object)
+            if totals is not None:
+                # concat + groupby keeps integer sums integer, unlike Series.add
+                partial = pd.concat([totals, partial]).groupby(level=0, sort=False).sum()
+            totals = partial
+
+    if totals is None:
+        sums = pd.DataFrame({key: pd.Series(dtype=str), value: pd.Series(dtype="int64")})
+    else:
+        sums = totals.rename_axis(key).reset_index()
+    sums.attrs["quality"] = quality
+    return sums
+
+
+def _report_key(kind, data, is_csv, engine):
+    return (kind, content_hash(data), is_csv, engine)
+
+
+def _parse(kind, data, is_csv, engine):
+    start = time.perf_counter()
+    if engine == STREAM_ENGINE:
+        frame = stream_report_sums(kind, data)
+    else:
+        frame = LOADERS[kind](data, is_csv, engine)
+    return frame, time.perf_counter() - start
+
+
+def _record(stats, kind, frame, seconds, engine, cached):
+    if stats is not None:
+        stats[kind] = {
+            "seconds": seconds,
+            "engine": engine,
+            "rows": len(frame),
+            "cached": cached,
+        }
+
+
+def load_report(kind, data, name, engine=None, stats=None):
+    """Parse and clean one uploaded report, reusing the cached frame if the
+    same bytes were already loaded with the same options.
+
+    If ``stats`` is given, ``stats[kind]`` is set to the parse time, reader
+    and whether the cache was hit. The returned DataFrame is shared with the
+    cache and must not be mutated.
+    """
+    return load_reports({kind: (data, name)}, engine=engine, workers=1, stats=stats)[kind]
+
+
+def load_file(kind, path, engine=None):
+    """Parse and clean a report straight from disk, bypassing the cache."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return LOADERS[kind](data, str(path).lower().endswith('.csv'), engine)
+
+
+# =============================
+# PARALLEL LOADING
+# =============================
+
+# Excel parsing holds the GIL, so independent reports are parsed in worker
+# processes. The pool is kept alive between Streamlit reruns.
+LOAD_WORKERS = int(os.environ.get("STOCK_MOVEMENT_LOAD_WORKERS", min(7, os.cpu_count() or 1)))
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # spawn, not fork: the Streamlit server process is multi-threaded
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _executor_workers = workers
+        return _executor
+
+
+def _pack_frame(frame):
+    # Arrow IPC moves column buffers without per-object pickling; columns
+    # Arrow cannot type (e.g. mixed str/int CP) fall back to pickle.
+    if pa is not None:
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        else:
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return "arrow", sink.getvalue()
+    return "pickle", pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _unpack_frame(packed):
+    fmt, payload = packed
+    if fmt == "arrow":
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+    return pickle.loads(payload)
+
+
+def _parse_in_worker(kind, data, is_csv, engine):
+    frame, seconds = _parse(kind, data, is_csv, engine)
+    return _pack_frame(frame), seconds
+
+
+def load_reports(sources, engine=None, workers=None, stats=None, use_cache=True, use_index=True,
+                 progress=None):
+    """Load several reports at once, parsing cache misses in parallel.
+
+    ``sources`` maps report kind to ``(data, name)``. Returns a dict of
+    cleaned frames in the same order. ``workers`` <= 1 parses in-process.
+    Product masters are also looked up in / saved to the on-disk PM index
+    unless ``use_index`` is false. Oversized Amazon Stock / Easycom
+    Inventory CSVs come back as per-key sums (see stream_report_sums).
+    ``progress(kind, done, total)`` is called as each report is ready; if
+    it raises, reports not yet started are abandoned.
+    """
+    workers = LOAD_WORKERS if workers is None else workers
+    frames = {}
+    pending = {}
+
+    def ready(kind):
+        if progress is not None:
+            progress(kind, len(frames), len(sources))
+
+    def finished(kind, frame, seconds):
+        # Kept as each parse finishes, so an abandoned load still caches them
+        key, _, _, kind_engine = pending[kind]
+        _record(stats, kind, frame, seconds, kind_engine, False)
+        if use_index and kind in pm_index.INDEX_KEYS:
+            pm_index.save(kind, kind_engine, key[1], frame)
+        frames[kind] = report_cache.put(key, frame) if use_cache else frame
+        ready(kind)
+
+    for kind, (data, name) in sources.items():
+        is_csv = name.lower().endswith('.csv')
+        if is_csv and use_streaming(kind, len(data)):
+            kind_engine = STREAM_ENGINE
+        else:
+            kind_engine = "csv" if is_csv else resolve_excel_engine(engine)
+        key = _report_key(kind, data, is_csv, kind_engine)
+        frame = report_cache.get(key) if use_cache else None
+        if frame is None and use_index and kind in pm_index.INDEX_KEYS:
+            start = time.perf_counter()
+            frame = pm_index.load(kind, kind_engine, key[1])
+            if frame is not None:
+                _record(stats, kind, frame, time.perf_counter() - start, "pm index", True)
+                frames[kind] = report_cache.put(key, frame) if use_cache else frame
+                ready(kind)
+                continue
+        if frame is not None:
+            _record(stats, kind, frame, 0.0, kind_engine, True)
+            frames[kind] = frame
+            ready(kind)
+        else:
+            pending[kind] = (key, data, is_csv, kind_engine)
+
+    if len(pending) > 1 and workers > 1:
+        executor = _get_executor(workers)
+        futures = {
+            executor.submit(_parse_in_worker, kind, data, is_csv, kind_engine): kind
+            for kind, (_, data, is_csv, kind_engine) in pending.items()
+        }
+        try:
+            for future in as_completed(futures):
+                packed, seconds = future.result()
+                finished(futures[future], _unpack_frame(packed), seconds)
+        finally:
+            for future in futures:
+                future.cancel()
+    else:
+        for kind, (_, data, is_csv, kind_engine) in pending.items():
+            finished(kind, *_parse(kind, data, is_csv, kind_engine))
+
+    return {kind: frames[kind] for kind in sources}
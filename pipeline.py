@@ -0,0 +1,488 @@
+import argparse
+import datetime
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import history
+from cache import LRUCache
+from cleaning import coerce_numeric
+from export import EXPORT_FORMATS, to_bytes
+from loaders import (
+    EXCEL_ENGINES, content_hash, load_reports, resolve_excel_engine, stream_report_sums, use_streaming
+)
+from pm_index import lookup
+from profiling import Profiler, stage
+from schemas import SchemaError
+from snapshot import write_snapshot
+from validation import validate
+
+# Input report kinds in the order the dashboard asks for them
+INPUTS = [
+    "qwtt_inventory",
+    "amazon_stock",
+    "flipkart_business",
+    "amazon_business",
+    "amazon_pm",
+    "flipkart_pm",
+    "flipkart_inventory",
+]
+
+OUTPUT_TABLES = {
+    "amazon_business_pivot": "amazon_business_pivot",
+    "flipkart_business_pivot": "flipkart_business_pivot",
+    "flipkart_qwtt_inward": "flipkart_qwtt_inward",
+    "amazon_qwtt_inward": "amazon_qwtt_inward",
+}
+
+
+# =============================
+# STAGES
+# =============================
+
+def build_sales_pivots(Amazon_Business_Report, Flipkart_Business_Report):
+    # Report identifiers arrive categorical (see schemas "codes"), so these
+    # group on integer codes; the pivots hold one row per identifier and are
+    # decoded to strings where they are normalised below.
+
+    # =============================
+    # FLIPKART SALES TRUTH PIVOT
+    # =============================
+    flipkart_sales_pivot = (
+        Flipkart_Business_Report
+        .pivot_table(
+            index="Product Id",
+            values="Final Sale Units",
+            aggfunc="sum",
+            observed=True
+        )
+        .reset_index()
+    )
+
+    # =========================
+    # AMAZON SALES TRUTH PIVOT
+    # =========================
+    amazon_sales_pivot = (
+        Amazon_Business_Report
+        .pivot_table(
+            index="(Parent) ASIN",
+            values="Total Orders",
+            aggfunc="sum",
+            observed=True
+        )
+        .reset_index()
+    )
+
+    # SAVE CORRECT TOTALS (VERY IMPORTANT)
+    truths = {
+        "flipkart_total_sale_units_truth": int(flipkart_sales_pivot["Final Sale Units"].sum()),
+        "flipkart_total_products_truth": len(flipkart_sales_pivot),
+        "amazon_total_orders_truth": int(amazon_sales_pivot["Total Orders"].sum()),
+        "amazon_total_products_truth": len(amazon_sales_pivot),
+    }
+    return amazon_sales_pivot, flipkart_sales_pivot, truths
+
+
+def build_amazon_business_pivot(amazon_sales_pivot, Amazon_PM, Qwtt_Inventory):
+    amazon_sales_pivot["(Parent) ASIN"] = (
+        amazon_sales_pivot["(Parent) ASIN"].astype(str).str.strip().str.upper()
+    )
+    amazon_sales_pivot.columns = amazon_sales_pivot.columns.str.strip()
+
+    # Merge Amazon Business with PM (ASIN is unique in the de-duplicated PM)
+    pm_columns = lookup(
+        Amazon_PM, "ASIN", amazon_sales_pivot["(Parent) ASIN"],
+        ["Brand", "Brand Manager", "Product Name", "Vendor SKU Codes", "EasycomSKU", "CP"]
+    )
+    amazon_business_pivot = pd.concat(
+        [amazon_sales_pivot[["(Parent) ASIN"]], pm_columns, amazon_sales_pivot[["Total Orders"]]],
+        axis=1
+    )
+
+    amazon_business_pivot = amazon_business_pivot[[
+        "(Parent) ASIN", "Brand", "Brand Manager", "Product Name",
+        "Vendor SKU Codes", "EasycomSKU", "Total Orders", "CP"
+    ]]
+
+    # Clean "nan" strings and set actual NaNs for better sorting
+    amazon_business_pivot["EasycomSKU"] = amazon_business_pivot["EasycomSKU"].replace(["nan", ""], pd.NA)
+
+    amazon_business_pivot["CP As Per Qty"] = (
+        amazon_business_pivot["CP"] * amazon_business_pivot["Total Orders"]
+    )
+
+    # Add QWTT Stock to Amazon
+    Qwtt_Inventory_Pivot = (
+        Qwtt_Inventory
+        .pivot_table(index="Asin", values="Sellable", aggfunc="sum", observed=True)
+        .reset_index()
+        .sort_values(by="Sellable", ascending=False)
+    )
+    Qwtt_Inventory_Pivot["Asin"] = (
+        Qwtt_Inventory_Pivot["Asin"].astype(str).str.strip().str.upper()
+    )
+    qwtt_stock_map = Qwtt_Inventory_Pivot.set_index("Asin")["Sellable"]
+    amazon_business_pivot["QWTT Stock"] = (
+        amazon_business_pivot["(Parent) ASIN"]
+        .map(qwtt_stock_map)
+        .fillna(0)
+        .astype(int)
+    )
+    return amazon_business_pivot
+
+
+def build_flipkart_business_pivot(flipkart_sales_pivot, Flipkart_PM, Flipkart_Easycom_Inventory):
+    flipkart_sales_pivot.columns = flipkart_sales_pivot.columns.str.strip()
+    flipkart_sales_pivot["Product Id"] = flipkart_sales_pivot["Product Id"].astype(str).str.strip().str.upper()
+
+    # Merge Flipkart Business with PM (FNS is unique in the de-duplicated PM)
+    pm_columns = lookup(
+        Flipkart_PM, "FNS", flipkart_sales_pivot["Product Id"],
+        ["Brand", "Brand Manager", "Product Name", "Vendor SKU Codes", "EasycomSKU", "CP"]
+    )
+    product_ids = flipkart_sales_pivot["Product Id"]
+    pm_columns["FNS"] = product_ids.where(product_ids.isin(Flipkart_PM["FNS"])).to_numpy()
+    Flipkart_Business_Pivot = pd.concat(
+        [flipkart_sales_pivot[["Product Id", "Final Sale Units"]], pm_columns],
+        axis=1
+    )
+
+    Flipkart_Business_Pivot = Flipkart_Business_Pivot[[
+        "Product Id", "Brand", "Brand Manager", "Product Name",
+        "Vendor SKU Codes", "EasycomSKU", "Final Sale Units", "CP", "FNS"
+    ]]
+
+    # Clean "nan" strings and set actual NaNs
+    Flipkart_Business_Pivot["EasycomSKU"] = Flipkart_Business_Pivot["EasycomSKU"].replace(["nan", ""], pd.NA)
+
+    # Sort to prioritize rows with EasycomSKU and drop duplicates by Product Id
+    Flipkart_Business_Pivot = (
+        Flipkart_Business_Pivot.sort_values(by="EasycomSKU", na_position='last')
+        .drop_duplicates(subset=["Product Id"])
+    )
+
+    Flipkart_Business_Pivot["CP"] = coerce_numeric(Flipkart_Business_Pivot["CP"], remove=("₹", ","))
+    Flipkart_Business_Pivot["Final Sale Units"] = coerce_numeric(Flipkart_Business_Pivot["Final Sale Units"])
+
+    Flipkart_Business_Pivot["CP As Per Qty"] = (
+        Flipkart_Business_Pivot["CP"] * Flipkart_Business_Pivot["Final Sale Units"]
+    )
+
+    # Add Flipkart QWTT Stock
+    flipkart_inventory_pivot = (
+        Flipkart_Easycom_Inventory
+        .pivot_table(index="sku", values="old_quantity", aggfunc="sum", observed=True)
+        .reset_index()
+    )
+
+    flipkart_stock_map = flipkart_inventory_pivot.set_index("sku")["old_quantity"]
+    Flipkart_Business_Pivot["QWTT Stock"] = (
+        Flipkart_Business_Pivot["EasycomSKU"].map(flipkart_stock_map)
+    )
+    return Flipkart_Business_Pivot
+
+
+def aggregate_by_key(target_keys, source, key, sums=(), firsts=()):
+    """Per-key sums / first non-null values of ``source`` aligned to ``target_keys``.
+
+    Equivalent to ``target_keys.map(source.groupby(key)[col].sum()).fillna(0)``
+    (and ``.first()`` without the fill) for every column, but the keys of both
+    sides are factorised together once and all aggregates run on integer codes.
+    """
+    codes, uniques = pd.factorize(
+        pd.concat([source[key], target_keys], ignore_index=True)
+    )
+    source_codes = codes[:len(source)]
+    target_codes = codes[len(source):]
+    matched = target_codes >= 0
+    keyed = source_codes >= 0
+
+    out = {}
+    for col in sums:
+        values = pd.to_numeric(source[col]).to_numpy(dtype="float64", na_value=np.nan)
+        use = keyed & ~np.isnan(values)
+        totals = np.bincount(source_codes[use], weights=values[use], minlength=len(uniques))
+        out[col] = np.where(matched, totals[target_codes], 0.0)
+
+    for col in firsts:
+        column = source[col]
+        use = np.flatnonzero(keyed & column.notna().to_numpy())
+        first_row = np.full(len(uniques), -1)
+        # Reversed so the earliest row per key is written last
+        first_row[source_codes[use][::-1]] = use[::-1]
+        rows = np.where(matched, first_row[target_codes], -1)
+        values = column.to_numpy(dtype=object)[np.maximum(rows, 0)]
+        values[rows < 0] = np.nan
+        out[col] = values
+    return out
+
+
+def build_flipkart_qwtt_inward(amazon_business_pivot, Flipkart_Business_Pivot):
+    flipkart_qwtt_inward = amazon_business_pivot.copy()
+
+    # One aggregation over the Flipkart side, joined once on EasycomSKU
+    flipkart_by_sku = aggregate_by_key(
+        flipkart_qwtt_inward["EasycomSKU"], Flipkart_Business_Pivot, "EasycomSKU",
+        sums=["Final Sale Units", "QWTT Stock"], firsts=["FNS"]
+    )
+    flipkart_qwtt_inward["Flipkart Sales"] = flipkart_by_sku["Final Sale Units"].astype(int)
+    flipkart_qwtt_inward["Flipkart QWTT Stock"] = flipkart_by_sku["QWTT Stock"].astype(int)
+    flipkart_qwtt_inward["FNS"] = flipkart_by_sku["FNS"]
+    return flipkart_qwtt_inward
+
+
+def build_amazon_qwtt_inward(Flipkart_Business_Pivot, amazon_business_pivot):
+    amazon_qwtt_inward = Flipkart_Business_Pivot.copy()
+
+    # One aggregation over the Amazon side, joined once on EasycomSKU
+    amazon_by_sku = aggregate_by_key(
+        amazon_qwtt_inward["EasycomSKU"], amazon_business_pivot, "EasycomSKU",
+        sums=["Total Orders", "QWTT Stock"], firsts=["(Parent) ASIN"]
+    )
+    amazon_qwtt_inward["Amazon Sales"] = amazon_by_sku["Total Orders"].astype(int)
+    amazon_qwtt_inward["Amazon Stock"] = amazon_by_sku["QWTT Stock"].astype(int)
+    amazon_qwtt_inward["Amazon ASIN"] = amazon_by_sku["(Parent) ASIN"]
+    return amazon_qwtt_inward
+
+
+def build_tables(frames, profiler=None):
+    """Compute the four dashboard tables from the cleaned input frames.
+
+    ``frames`` maps each kind in INPUTS to its loaded DataFrame (see
+    loaders.LOADERS). The input frames are not modified. Each stage is
+    recorded on ``profiler`` (a profiling.Profiler) when one is given.
+    The result also holds the data-quality tables (see validation.validate).
+    """
+    with stage(profiler, "sales_pivots") as info:
+        amazon_sales_pivot, flipkart_sales_pivot, truths = build_sales_pivots(
+            frames["amazon_business"], frames["flipkart_business"]
+        )
+        info["rows"] = len(amazon_sales_pivot) + len(flipkart_sales_pivot)
+
+    with stage(profiler, "amazon_business_pivot") as info:
+        amazon_business_pivot = build_amazon_business_pivot(
+            amazon_sales_pivot, frames["amazon_pm"], frames["qwtt_inventory"]
+        )
+        info["rows"] = len(amazon_business_pivot)
+
+    with stage(profiler, "flipkart_business_pivot") as info:
+        Flipkart_Business_Pivot = build_flipkart_business_pivot(
+            flipkart_sales_pivot, frames["flipkart_pm"], frames["flipkart_inventory"]
+        )
+        info["rows"] = len(Flipkart_Business_Pivot)
+
+    with stage(profiler, "flipkart_qwtt_inward") as info:
+        flipkart_qwtt_inward = build_flipkart_qwtt_inward(amazon_business_pivot, Flipkart_Business_Pivot)
+        info["rows"] = len(flipkart_qwtt_inward)
+
+    with stage(profiler, "amazon_qwtt_inward") as info:
+        amazon_qwtt_inward = build_amazon_qwtt_inward(Flipkart_Business_Pivot, amazon_business_pivot)
+        info["rows"] = len(amazon_qwtt_inward)
+
+    results = {
+        "amazon_sales_pivot": amazon_sales_pivot,
+        "flipkart_sales_pivot": flipkart_sales_pivot,
+        "amazon_business_pivot": amazon_business_pivot,
+        "flipkart_business_pivot": Flipkart_Business_Pivot,
+        "flipkart_qwtt_inward": flipkart_qwtt_inward,
+        "amazon_qwtt_inward": amazon_qwtt_inward,
+        "flipkart_qwtt_inward_filter": flipkart_qwtt_inward[
+            flipkart_qwtt_inward["Flipkart QWTT Stock"] == 0
+        ].reset_index(drop=True),
+        "amazon_qwtt_inward_filter": amazon_qwtt_inward[
+            amazon_qwtt_inward["Amazon Stock"] == 0
+        ].reset_index(drop=True),
+    }
+    results.update(truths)
+
+    with stage(profiler, "validate"):
+        results.update(validate(frames, results))
+    return results
+
+
+def record_load_stats(profiler, stats):
+    # Parses may run in worker processes, so only time and rows are known
+    if profiler is not None:
+        for kind, stat in stats.items():
+            profiler.add(f"parse:{kind}", stat["seconds"], rows=stat["rows"])
+
+
+def load_inputs(paths, profiler=None, engine=None, workers=None):
+    sources = {}
+    streamed = []
+    for kind in INPUTS:
+        if use_streaming(kind, os.path.getsize(paths[kind])):
+            # Summed straight from disk in chunks, never read whole
+            streamed.append(kind)
+            continue
+        with open(paths[kind], "rb") as f:
+            sources[kind] = (f.read(), os.path.basename(paths[kind]))
+
+    stats = {}
+    with stage(profiler, "load") as info:
+        frames = load_reports(sources, engine=engine, workers=workers, stats=stats, use_cache=False)
+        for kind in streamed:
+            with stage(profiler, f"stream:{kind}") as stream_info:
+                frames[kind] = stream_report_sums(kind, paths[kind])
+                stream_info["rows"] = len(frames[kind])
+        info["rows"] = sum(len(df) for df in frames.values())
+    record_load_stats(profiler, stats)
+    return {kind: frames[kind] for kind in INPUTS}
+
+
+def run(paths, profiler=None, engine=None, workers=None):
+    """Load the seven input files from disk and build the output tables."""
+    frames = load_inputs(paths, profiler, engine, workers)
+    return build_tables(frames, profiler)
+
+
+# =============================
+# SHARED RESULTS
+# =============================
+
+# Finished tables shared by every dashboard session in this process, keyed on
+# the fingerprint of all seven inputs, so users opening the same day's files
+# get them without re-loading or re-computing (and without a copy each).
+RESULTS_CACHE_ENTRIES = int(os.environ.get("STOCK_MOVEMENT_RESULTS_ENTRIES", 8))
+RESULTS_CACHE_BYTES = int(os.environ.get("STOCK_MOVEMENT_RESULTS_MAX_BYTES", 1024 ** 3))
+RESULTS_TTL = float(os.environ.get("STOCK_MOVEMENT_RESULTS_TTL", 12 * 3600))
+
+results_cache = LRUCache(
+    max_entries=RESULTS_CACHE_ENTRIES, max_bytes=RESULTS_CACHE_BYTES, ttl=RESULTS_TTL
+)
+
+
+def inputs_fingerprint(sources, engine=None):
+    """Fingerprint of a full input set ``{kind: (data, name)}``: every
+    report's content hash plus the Excel reader used."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(resolve_excel_engine(engine).encode())
+    for kind in INPUTS:
+        digest.update(f"\x1f{kind}={content_hash(sources[kind][0])}".encode())
+    return digest.hexdigest()
+
+
+def write_tables(results, output_dir, fmt="Excel"):
+    os.makedirs(output_dir, exist_ok=True)
+    extension, _ = EXPORT_FORMATS[fmt]
+    written = []
+    for key, name in OUTPUT_TABLES.items():
+        path = os.path.join(output_dir, f"{name}.{extension}")
+        with open(path, "wb") as f:
+            f.write(to_bytes(results[key], fmt))
+        written.append(path)
+    return written
+
+
+def record_history(results, frames, paths, db_path, report_date, period_days=history.REPORT_PERIOD_DAYS):
+    def file_hash(kind):
+        with open(paths[kind], "rb") as f:
+            return content_hash(f.read())
+
+    conn = history.connect(db_path)
+    try:
+        for channel, kind in [("amazon", "amazon_business"), ("flipkart", "flipkart_business")]:
+            history.ingest_sales(
+                conn, channel, report_date, results[f"{channel}_sales_pivot"], file_hash(kind), period_days
+            )
+        for kind in history.STOCK_SOURCES:
+            history.ingest_stock(conn, kind, report_date, frames[kind], file_hash(kind))
+    finally:
+        conn.close()
+
+
+# =============================
+# COMMAND LINE
+# =============================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the stock movement tables without the Streamlit dashboard."
+    )
+    for kind in INPUTS:
+        parser.add_argument(f"--{kind.replace('_', '-')}", dest=kind, required=True, metavar="PATH")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for the four output tables")
+    parser.add_argument("--format", choices=[ext for ext, _ in EXPORT_FORMATS.values()], default="xlsx")
+    parser.add_argument("--excel-engine", choices=EXCEL_ENGINES, default=None,
+                        help="Excel reader (default: STOCK_MOVEMENT_EXCEL_ENGINE or auto)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes used to parse the inputs (1 = sequential)")
+    parser.add_argument("--timings", action="store_true", help="Print per-stage time and memory to stderr")
+    parser.add_argument("--profile-json", default=None, metavar="PATH",
+                        help="Write per-stage time, memory and row counts as JSON ('-' for stdout)")
+    parser.add_argument("--quality", action="store_true",
+                        help="Print per-input data-quality counts and the total reconciliation to stderr")
+    parser.add_argument("--snapshot", default=None, metavar="PATH",
+                        help="Also write every table, the report totals and input fingerprints as one snapshot file")
+    parser.add_argument("--history-db", default=None, metavar="PATH",
+                        help="Also record the business reports' sales and the stock reports in this history store")
+    parser.add_argument("--report-date", default=None,
+                        help="Last day the business reports cover (default: today)")
+    parser.add_argument("--report-days", type=int, default=history.REPORT_PERIOD_DAYS,
+                        help="Days the business reports cover, ending on --report-date "
+                             f"(default: {history.REPORT_PERIOD_DAYS})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = {kind: getattr(args, kind) for kind in INPUTS}
+
+    profiler = Profiler()
+    try:
+        frames = load_inputs(paths, profiler, args.excel_engine, args.workers)
+    except SchemaError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if args.timings or args.profile_json:
+        profiler.record_memory(frames)
+    results = build_tables(frames, profiler)
+    with stage(profiler, "write"):
+        fmt = next(name for name, (ext, _) in EXPORT_FORMATS.items() if ext == args.format)
+        written = write_tables(results, args.output_dir, fmt)
+
+    if args.snapshot:
+        with stage(profiler, "snapshot"):
+            sources = {}
+            for kind in INPUTS:
+                with open(paths[kind], "rb") as f:
+                    sources[kind] = (f.read(), os.path.basename(paths[kind]))
+            with open(args.snapshot, "wb") as f:
+                f.write(write_snapshot(
+                    results, inputs_fingerprint(sources, args.excel_engine), sources, args.excel_engine
+                ))
+        written.append(args.snapshot)
+
+    if args.history_db:
+        with stage(profiler, "history"):
+            record_history(
+                results, frames, paths, args.history_db,
+                args.report_date or datetime.date.today(), args.report_days
+            )
+
+    for path in written:
+        print(path)
+    if args.quality:
+        print(results["input_quality"].to_string(index=False), file=sys.stderr)
+        print(results["reconciliation"].to_string(index=False), file=sys.stderr)
+    else:
+        for row in results["reconciliation"].itertuples():
+            if not row.OK:
+                print(f"warning: {row.Check}: tables total {row.Table:,} vs {row.Reports:,} in the reports",
+                      file=sys.stderr)
+    if args.timings:
+        print(profiler.to_frame().to_string(index=False), file=sys.stderr)
+        print(profiler.memory_frame().to_string(index=False), file=sys.stderr)
+    if args.profile_json == "-":
+        print(profiler.to_json(indent=2))
+    elif args.profile_json:
+        with open(args.profile_json, "w") as f:
+            f.write(profiler.to_json(indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
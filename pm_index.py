@@ -0,0 +1,95 @@
+import glob
+import os
+import pickle
+import tempfile
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Product masters change rarely, so their normalised + de-duplicated form is
+# persisted per file hash and reader engine and reloaded (memory-mapped)
+# instead of re-cleaned.
+INDEX_DIR = os.environ.get(
+    "STOCK_MOVEMENT_INDEX_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "stock_movement", "pm_index"),
+)
+INDEX_KEEP = 4
+# Bumped when the stored frame changes (2: data-quality counts in attrs,
+# 3: numeric Flipkart PM CP, 4: rows counted after de-duplication)
+INDEX_VERSION = 4
+
+# Unique lookup key of each product master after de-duplication
+INDEX_KEYS = {
+    "amazon_pm": "ASIN",
+    "flipkart_pm": "FNS",
+}
+
+
+def _path(kind, engine, digest, ext):
+    return os.path.join(INDEX_DIR, f"{kind}-v{INDEX_VERSION}-{engine}-{digest}.{ext}")
+
+
+def load(kind, engine, digest):
+    """Return the persisted index frame for this PM file as read by
+    ``engine``, or None."""
+    path = _path(kind, engine, digest, "arrow")
+    if pa is not None and os.path.exists(path):
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+    path = _path(kind, engine, digest, "pkl")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    return None
+
+
+def save(kind, engine, digest, frame):
+    """Persist an index frame atomically; failures only cost a rebuild later."""
+    try:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=INDEX_DIR, prefix=f".{kind}-")
+        with os.fdopen(fd, "wb") as f:
+            ext = _write(frame, f)
+        os.replace(tmp, _path(kind, engine, digest, ext))
+    except OSError:
+        return
+    _prune(kind)
+
+
+def _write(frame, f):
+    if pa is not None:
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        else:
+            with pa.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table)
+            return "arrow"
+    pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return "pkl"
+
+
+def _prune(kind):
+    paths = sorted(
+        glob.glob(os.path.join(INDEX_DIR, f"{kind}-*")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    for path in paths[INDEX_KEEP:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def lookup(pm, key, values, columns):
+    """Left-join ``columns`` of a de-duplicated PM onto ``values`` by hash lookup.
+
+    Same rows as ``values.to_frame().merge(pm, left_on=..., right_on=key,
+    how="left")`` since ``key`` is unique in the PM.
+    """
+    mapped = pm.set_index(key)[columns].reindex(values.to_numpy())
+    return mapped.reset_index(drop=True)
@@ -0,0 +1,229 @@
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_MB = 1024 ** 2
+
+
+def memory_usage():
+    """(current RSS, peak RSS) of this process in bytes; None where unknown."""
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        # peak_wset is the Windows high-water mark
+        return info.rss, _stage_peaks.process_peak() or getattr(info, "peak_wset", None) or _resource_peak()
+    rss = None
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    return rss, _stage_peaks.process_peak() or _resource_peak()
+
+
+def _resource_peak():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _high_water_mark():
+    # Linux VmHWM: peak RSS since start or the last reset, in bytes
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _reset_high_water_mark():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class _StagePeaks:
+    """Peak RSS of every open stage, nested or in other threads.
+
+    The process has a single RSS high-water mark. Each stage start folds it
+    into the peaks of the stages already open and then resets it, so every
+    stage's peak covers its own lifetime only. Where the mark cannot be
+    reset (anything but Linux), stages get no peak of their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = {}
+        self._process_peak = None
+
+    def _fold(self):
+        mark = _high_water_mark()
+        if mark is None:
+            return
+        self._process_peak = max(self._process_peak or 0, mark)
+        for token, peak in self._open.items():
+            self._open[token] = max(peak, mark)
+
+    def start(self):
+        with self._lock:
+            self._fold()
+            if not _reset_high_water_mark():
+                return None
+            token = object()
+            self._open[token] = _high_water_mark() or 0
+            return token
+
+    def stop(self, token):
+        if token is None:
+            return None
+        with self._lock:
+            self._fold()
+            return self._open.pop(token)
+
+    def process_peak(self):
+        """Peak RSS since the process started, across resets (None before any)."""
+        with self._lock:
+            if self._process_peak is None:
+                return None
+            self._fold()
+            return self._process_peak
+
+
+_stage_peaks = _StagePeaks()
+
+
+class Profiler:
+    """Collects wall time, memory and row counts for named pipeline stages.
+
+    Usage::
+
+        profiler = Profiler()
+        with profiler.stage("merge") as info:
+            df = ...
+            info["rows"] = len(df)
+
+    ``on_stage(name)``, if given, is called as each stage starts; an
+    exception it raises aborts the stage (see jobs.Job cancellation).
+    """
+
+    def __init__(self, on_stage=None):
+        self.started = datetime.datetime.now()
+        self.records = []
+        self.memory = []
+        self.on_stage = on_stage
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        if self.on_stage is not None:
+            self.on_stage(name)
+        info = {}
+        rss_before, _ = memory_usage()
+        token = _stage_peaks.start()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - start
+            peak = _stage_peaks.stop(token)
+            rss_after, _ = memory_usage()
+            self.add(
+                name, seconds, rows=info.get("rows"),
+                rss=rss_after,
+                rss_delta=None if rss_before is None or rss_after is None else rss_after - rss_before,
+                peak_rss=peak,
+            )
+
+    def add(self, name, seconds, rows=None, rss=None, rss_delta=None, peak_rss=None):
+        """Record a stage measured elsewhere (e.g. in a worker process).
+        ``peak_rss`` is the highest RSS during the stage itself."""
+        self.records.append({
+            "stage": name,
+            "seconds": round(seconds, 6),
+            "rows": None if rows is None else int(rows),
+            "rss_mb": None if rss is None else round(rss / _MB, 1),
+            "rss_delta_mb": None if rss_delta is None else round(rss_delta / _MB, 1),
+            "peak_rss_mb": None if peak_rss is None else round(peak_rss / _MB, 1),
+        })
+
+    def include(self, other):
+        """Copy the stages and frame memory recorded by ``other`` (e.g. a
+        background job's profiler), leaving ``other`` unchanged."""
+        self.records.extend(dict(record) for record in other.records)
+        self.memory.extend(dict(row) for row in other.memory)
+
+    def record_memory(self, frames):
+        """Record each frame's memory as held vs. with its categorical
+        columns decoded to object strings."""
+        for name, df in frames.items():
+            held = decoded = int(df.memory_usage(deep=True, index=False).sum())
+            for column in df.columns:
+                if isinstance(df[column].dtype, pd.CategoricalDtype):
+                    decoded += int(
+                        df[column].astype(object).memory_usage(deep=True, index=False)
+                        - df[column].memory_usage(deep=True, index=False)
+                    )
+            self.memory.append({
+                "frame": name,
+                "rows": len(df),
+                "held_mb": round(held / _MB, 1),
+                "as_strings_mb": round(decoded / _MB, 1),
+            })
+
+    def memory_frame(self):
+        return pd.DataFrame(self.memory, columns=["frame", "rows", "held_mb", "as_strings_mb"])
+
+    def to_frame(self):
+        return pd.DataFrame(
+            self.records,
+            columns=["stage", "seconds", "rows", "rss_mb", "rss_delta_mb", "peak_rss_mb"],
+        )
+
+    def to_dict(self):
+        _, peak = memory_usage()
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            # Wall time so far; stages nest (parse:* inside load), so summing would double count
+            "total_seconds": round(time.perf_counter() - self._start, 6),
+            "stages": self.records,
+            "memory": self.memory,
+            # The stages' peaks are their own; this is the whole process's
+            "peak_rss_mb": None if peak is None else round(peak / _MB, 1),
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+@contextmanager
+def stage(profiler, name):
+    """``profiler.stage(name)`` that is a no-op when no profiler is given."""
+    if profiler is None:
+        yield {}
+    else:
+        with profiler.stage(name) as info:
+            yield info
+
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache
+
+# Brand x Brand Manager x channel totals of the business pivots:
+#   channel -> (table, units column)
+ROLLUP_CHANNELS = {
+    "Amazon": ("amazon_business_pivot", "Total Orders"),
+    "Flipkart": ("flipkart_business_pivot", "Final Sale Units"),
+}
+ROLLUP_LEVELS = ["Channel", "Brand Manager", "Brand"]
+ROLLUP_MEASURES = ["Products", "Total Orders", "Final Sale Units", "CP As Per Qty", "QWTT Stock"]
+
+# Products the product master has no Brand / Brand Manager for
+UNMAPPED = "(Unmapped)"
+
+# Cubes per data fingerprint
+rollup_cache = LRUCache(max_entries=16, max_bytes=64 * 1024 ** 2)
+
+
+def build_cube(results):
+    """One row per channel, Brand Manager and Brand with the summed
+    measures; the other channel's units column is 0."""
+    parts = []
+    for channel, (table, units) in ROLLUP_CHANNELS.items():
+        part = (
+            results[table]
+            .groupby(["Brand Manager", "Brand"], observed=True, dropna=False, sort=False)
+            .agg(**{
+                "Products": ("CP As Per Qty", "size"),
+                units: (units, "sum"),
+                "CP As Per Qty": ("CP As Per Qty", "sum"),
+                "QWTT Stock": ("QWTT Stock", "sum"),
+            })
+            .reset_index()
+        )
+        part.insert(0, "Channel", channel)
+        parts.append(part)
+
+    cube = pd.concat(parts, ignore_index=True)
+    # The cube is a few hundred rows, so plain strings are fine here
+    for level in ROLLUP_LEVELS[1:]:
+        cube[level] = cube[level].astype(object).where(cube[level].notna(), UNMAPPED)
+    cube[ROLLUP_MEASURES] = cube[ROLLUP_MEASURES].fillna(0)
+    return cube[ROLLUP_LEVELS + ROLLUP_MEASURES]
+
+
+def cached_cube(fingerprint, results):
+    """build_cube() for a results set, computed once per data fingerprint.
+    The returned frame is shared and must not be mutated."""
+    return rollup_cache.get_or_create(fingerprint, lambda: build_cube(results))
+
+
+def rollup(cube, by, filters=None):
+    """Measures summed by the ``by`` levels over the cube rows matching
+    ``filters`` ({level: value}), largest CP As Per Qty first."""
+    view = cube
+    for level, value in (filters or {}).items():
+        view = view[view[level] == value]
+    return (
+        view.groupby(list(by), sort=False)[ROLLUP_MEASURES].sum()
+        .reset_index()
+        .sort_values("CP As Per Qty", ascending=False, ignore_index=True)
+    )
+
+
+def detail_rows(detail, filters):
+    """Rows of a detail table (e.g. amazon_business_pivot) in the Brand
+    Manager / Brand selected by ``filters``."""
+    mask = np.ones(len(detail), dtype=bool)
+    for level in ROLLUP_LEVELS[1:]:
+        if level in filters:
+            column = detail[level]
+            selected = column.isna() if filters[level] == UNMAPPED else column == filters[level]
+            mask &= selected.to_numpy()
+    return detail[mask]
@@ -0,0 +1,120 @@
+import pandas as pd
+
+# Declared layout of every input report.
+#   codes      identifier columns repeated on many rows, dictionary-encoded
+#              (categorical) at read time so grouping runs on integer codes
+#   ids        identifier columns, always read as strings
+#   categories low-cardinality text columns, read as strings and stored as
+#              pandas categoricals
+#   text       free text columns, read as strings
+#   numeric    quantity / price columns, cleaned to numbers after read
+# Every listed column is required; anything else in the file is skipped.
+SCHEMAS = {
+    "qwtt_inventory": {
+        "label": "QWTT Inventory",
+        "codes": ["Asin"],
+        "numeric": ["Sellable"],
+    },
+    "amazon_stock": {
+        "label": "Amazon Stock",
+        "codes": ["asin"],
+        "numeric": ["afn-warehouse-quantity"],
+    },
+    "flipkart_business": {
+        "label": "Flipkart Business Report",
+        "codes": ["Product Id"],
+        "numeric": ["Final Sale Units"],
+    },
+    "amazon_business": {
+        "label": "Amazon Business Report",
+        "codes": ["(Parent) ASIN"],
+        "numeric": ["Total Order Items", "Total Order Items - B2B"],
+    },
+    "amazon_pm": {
+        "label": "Amazon PM",
+        "ids": ["ASIN", "Vendor SKU Codes", "EasycomSKU"],
+        "categories": ["Brand", "Brand Manager"],
+        "text": ["Product Name"],
+        "numeric": ["CP"],
+    },
+    "flipkart_pm": {
+        "label": "Flipkart PM",
+        "ids": ["FNS", "Vendor SKU Codes", "EasycomSKU"],
+        "categories": ["Brand", "Brand Manager"],
+        "text": ["Product Name"],
+        "numeric": ["CP"],
+    },
+    "flipkart_inventory": {
+        "label": "Flipkart Easycom Inventory",
+        "codes": ["sku"],
+        "numeric": ["old_quantity"],
+    },
+}
+
+THOUSANDS = ","
+
+
+class SchemaError(ValueError):
+    """An input report does not have the columns the pipeline needs."""
+
+
+def required_columns(kind):
+    schema = SCHEMAS[kind]
+    return (
+        schema.get("codes", []) + schema.get("ids", []) + schema.get("categories", [])
+        + schema.get("text", []) + schema.get("numeric", [])
+    )
+
+
+def read_options(kind):
+    """Keyword arguments for pd.read_csv / ExcelFile.parse for this report."""
+    schema = SCHEMAS[kind]
+    wanted = set(required_columns(kind))
+    # Codes and categories are read as strings and converted by enforce_schema:
+    # the readers' own category parsing is several times slower and fails on
+    # columns mixing numbers and text (common in Excel PM sheets)
+    dtype = {c: str for c in required_columns(kind) if c not in schema.get("numeric", [])}
+    return {
+        # Header cells sometimes carry stray whitespace (e.g. Flipkart PM)
+        "usecols": lambda c: str(c).strip() in wanted,
+        "dtype": dtype,
+        "thousands": THOUSANDS,
+    }
+
+
+def encode(values):
+    """Dictionary-encode a text column as a categorical with sorted
+    categories, so grouping on its codes orders groups like the strings."""
+    codes, categories = pd.factorize(values, sort=True)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categories),
+        index=values.index, name=values.name,
+    )
+
+
+def enforce_schema(kind, df):
+    """Normalise headers, fail clearly on missing columns and fix up dtypes
+    for columns whose header did not match exactly at read time."""
+    schema = SCHEMAS[kind]
+    df.columns = df.columns.astype(str).str.strip()
+
+    missing = [c for c in required_columns(kind) if c not in df.columns]
+    if missing:
+        raise SchemaError(
+            f"{schema['label']} is missing required column(s): {', '.join(missing)}"
+        )
+
+    for c in schema.get("ids", []) + schema.get("text", []):
+        if df[c].dtype != object and not pd.api.types.is_string_dtype(df[c]):
+            df[c] = df[c].astype(str).where(df[c].notna())
+    for c in schema.get("codes", []):
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            continue
+        if df[c].dtype != object and not pd.api.types.is_string_dtype(df[c]):
+            df[c] = df[c].astype(str).where(df[c].notna())
+        df[c] = encode(df[c])
+    for c in schema.get("categories", []):
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            continue
+        df[c] = df[c].astype(str).where(df[c].notna()).astype("category")
+    return df
@@ -0,0 +1,118 @@
+import datetime
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from loaders import content_hash, resolve_excel_engine
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# A snapshot is one zip holding every computed table as an Arrow IPC file
+# (buffers compressed by Arrow, so the zip itself only stores them) plus
+# snapshot.json with the run metadata, report totals and input fingerprints.
+# Loading one restores the dashboard without re-reading any report.
+SNAPSHOT_FORMAT = "stock_movement_snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EXTENSION = "smsnap"
+SNAPSHOT_MIME = "application/zip"
+SNAPSHOT_COMPRESSION = os.environ.get("STOCK_MOVEMENT_SNAPSHOT_COMPRESSION", "zstd") or None
+METADATA_NAME = "snapshot.json"
+
+SNAPSHOTS_AVAILABLE = pa is not None
+
+
+class SnapshotError(ValueError):
+    """A file is not a snapshot this version can load."""
+
+
+def _plain(value):
+    # numpy scalars -> int / float for JSON
+    return value.item() if hasattr(value, "item") else value
+
+
+def write_snapshot(results, fingerprint, sources=None, engine=None):
+    """Serialise a build_tables() result set to snapshot bytes.
+
+    ``fingerprint`` is the inputs_fingerprint() the tables were built from;
+    ``sources`` (``{kind: (data, name)}``), when given, records each input's
+    name, size and content hash.
+    """
+    if pa is None:
+        raise SnapshotError("Snapshots need pyarrow, which is not installed")
+
+    tables = {key: value for key, value in results.items() if isinstance(value, pd.DataFrame)}
+    metadata = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "fingerprint": fingerprint,
+        "excel_engine": resolve_excel_engine(engine),
+        "inputs": {
+            kind: {"name": name, "bytes": len(data), "hash": content_hash(data)}
+            for kind, (data, name) in (sources or {}).items()
+        },
+        "tables": {key: {"rows": len(df), "columns": list(map(str, df.columns))} for key, df in tables.items()},
+        "totals": {key: _plain(value) for key, value in results.items() if key not in tables},
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+    }
+
+    options = pa.ipc.IpcWriteOptions(compression=SNAPSHOT_COMPRESSION)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        archive.writestr(METADATA_NAME, json.dumps(metadata, indent=2))
+        for key, df in tables.items():
+            # A RangeIndex is kept as metadata only; sorted tables keep their labels
+            table = pa.Table.from_pandas(df, preserve_index=None)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+            archive.writestr(f"{key}.arrow", sink.getvalue().to_pybytes())
+    return buffer.getvalue()
+
+
+def read_metadata(data):
+    """The snapshot.json of a snapshot, without reading any table."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            metadata = json.loads(archive.read(METADATA_NAME))
+    except (zipfile.BadZipFile, KeyError, ValueError):
+        raise SnapshotError("Not a stock movement snapshot") from None
+    if metadata.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError("Not a stock movement snapshot")
+    if metadata.get("version", 0) > SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f"Snapshot version {metadata['version']} is newer than this app supports ({SNAPSHOT_VERSION})"
+        )
+    return metadata
+
+
+def read_snapshot(data):
+    """The result set stored in a snapshot, shaped like build_tables()'s."""
+    if pa is None:
+        raise SnapshotError("Snapshots need pyarrow, which is not installed")
+    metadata = read_metadata(data)
+    results = {}
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for key in metadata["tables"]:
+            try:
+                payload = pa.py_buffer(archive.read(f"{key}.arrow"))
+            except KeyError:
+                raise SnapshotError(f"Snapshot is missing the {key} table") from None
+            # Read straight from the buffer: no parsing, only Arrow -> pandas
+            table = pa.ipc.open_file(payload).read_all()
+            df = table.to_pandas()
+            for field in table.schema:
+                # All-missing columns come back as None; the pipeline has NaN there
+                if pa.types.is_null(field.type):
+                    df[field.name] = pd.Series(np.nan, index=df.index, dtype=object)
+            results[key] = df
+    results.update(metadata["totals"])
+    return results
@@ -0,0 +1,26 @@
+import pytest
+
+from batch import AccountError, classify
+
+
+@pytest.mark.parametrize("filename, kind", [
+    ("BusinessReport-01-06-2024.csv", "amazon_business"),
+    ("Amazon Business Report.xlsx", "amazon_business"),
+    ("BusinessReport-Flipkart.xlsx", "flipkart_business"),
+    ("flipkart_business.xlsx", "flipkart_business"),
+    ("Flipkart Easycom Inventory.csv", "flipkart_inventory"),
+    ("amazon_stock.csv", "amazon_stock"),
+    ("notes.txt", None),
+])
+def test_classify(filename, kind):
+    assert classify(filename) == kind
+
+
+@pytest.mark.parametrize("filename", [
+    "amazon_stock.xlsx",
+    "Flipkart Easycom Inventory.xlsx",
+    "BusinessReport-Flipkart.csv",
+])
+def test_classify_rejects_wrong_file_type(filename):
+    with pytest.raises(AccountError, match="must be"):
+        classify(filename)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, frame_nbytes
+
+
+def movement_entry(dates, keys):
+    stock = np.zeros((dates, keys))
+    return {
+        "dates": pd.DatetimeIndex(pd.date_range("2024-01-01", periods=dates)),
+        "keys": pd.Index([f"K{i}" for i in range(keys)]),
+        "stock": stock,
+        "cum_out": stock.copy(),
+        "cum_in": stock.copy(),
+    }
+
+
+def test_frame_nbytes_counts_arrays_and_indexes():
+    entry = movement_entry(10, 100)
+    assert frame_nbytes(entry) >= 3 * 10 * 100 * 8 + entry["keys"].memory_usage(deep=True)
+
+
+def test_large_matrix_entry_evicted_by_byte_limit():
+    small = movement_entry(10, 100)
+    large = movement_entry(100, 1000)
+    cache = LRUCache(max_entries=8, max_bytes=frame_nbytes(large) + frame_nbytes(small) // 2)
+    cache.put("large", large)
+    cache.put("small", small)
+    assert "large" not in cache
+    assert "small" in cache
+    assert cache.nbytes == frame_nbytes(small)
+
+
+def test_matrix_entry_larger_than_budget_not_kept():
+    cache = LRUCache(max_entries=8, max_bytes=1024)
+    cache.put("large", movement_entry(10, 100))
+    assert len(cache) == 0
@@ -0,0 +1,37 @@
+import io
+
+import pandas as pd
+import pytest
+
+from loaders import read_report
+
+
+def pm_sheet():
+    return pd.DataFrame({
+        "ASIN": ["A1", "A2", "A3"],
+        "Vendor SKU Codes": ["V1", "V2", "V3"],
+        "EasycomSKU": ["E1", "E2", "E3"],
+        "Brand": [12, "Acme", None],
+        "Brand Manager": ["Ravi", 7, "Ravi"],
+        "Product Name": ["P1", "P2", "P3"],
+        "CP": [100, 200, 300],
+    })
+
+
+@pytest.mark.parametrize("engine", ["calamine", "openpyxl"])
+def test_mixed_type_brand_excel(engine):
+    pytest.importorskip("python_calamine" if engine == "calamine" else engine)
+    buffer = io.BytesIO()
+    pm_sheet().to_excel(buffer, index=False)
+    df = read_report("amazon_pm", buffer.getvalue(), False, engine)
+    assert isinstance(df["Brand"].dtype, pd.CategoricalDtype)
+    assert df["Brand"].tolist()[:2] == ["12", "Acme"]
+    assert df["Brand"].isna().iloc[2]
+    assert df["Brand Manager"].tolist() == ["Ravi", "7", "Ravi"]
+
+
+def test_mixed_type_brand_csv():
+    data = pm_sheet().to_csv(index=False).encode()
+    df = read_report("amazon_pm", data, True)
+    assert isinstance(df["Brand"].dtype, pd.CategoricalDtype)
+    assert df["Brand"].tolist()[:2] == ["12", "Acme"]
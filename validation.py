@@ -0,0 +1,76 @@
+import pandas as pd
+
+from schemas import SCHEMAS
+
+# Counts gathered per report while it is cleaned (loaders put them in
+# ``frame.attrs["quality"]``), as column -> count name. "Rows" are the rows
+# the other counts are taken over: for the product masters, those left
+# after dropping duplicate keys (rows read = Rows + Duplicate keys dropped)
+QUALITY_COUNTS = {
+    "Rows": "rows",
+    "Blank → 0": "blank",
+    "Not a number → 0": "unparsed",
+    "Negative → 0": "negative",
+    "Duplicate keys dropped": "duplicate_keys",
+}
+
+# Products in a business pivot the product master has no row for:
+#   input -> (table, key column, product master, PM key column)
+UNMAPPED = {
+    "amazon_business": ("amazon_business_pivot", "(Parent) ASIN", "amazon_pm", "ASIN"),
+    "flipkart_business": ("flipkart_business_pivot", "Product Id", "flipkart_pm", "FNS"),
+}
+
+# Report totals the tables should add back up to:
+#   (check, truth key, table, column or None for the row count)
+RECONCILIATION = [
+    ("Amazon Total Orders", "amazon_total_orders_truth", "amazon_business_pivot", "Total Orders"),
+    ("Amazon products", "amazon_total_products_truth", "amazon_business_pivot", None),
+    ("Flipkart Final Sale Units", "flipkart_total_sale_units_truth", "flipkart_business_pivot", "Final Sale Units"),
+    ("Flipkart products", "flipkart_total_products_truth", "flipkart_business_pivot", None),
+]
+
+
+def input_quality(frames, results):
+    """One row per input: rows checked and how many were blank, not numbers,
+    negative, duplicate keys or missing from the product master.
+
+    Everything but the last comes from the counts taken while cleaning;
+    the PM check runs on the business pivots (one row per product), so the
+    reports are not scanned again. Counts a loader does not take are blank.
+    """
+    rows = []
+    for kind, frame in frames.items():
+        counts = frame.attrs.get("quality", {})
+        row = {"Input": SCHEMAS[kind]["label"]}
+        for column, name in QUALITY_COUNTS.items():
+            row[column] = counts.get(name)
+        if kind in UNMAPPED:
+            table, key, pm, pm_key = UNMAPPED[kind]
+            row["Not in PM"] = int((~results[table][key].isin(frames[pm][pm_key])).sum())
+        rows.append(row)
+    return pd.DataFrame(rows, columns=["Input"] + list(QUALITY_COUNTS) + ["Not in PM"]).convert_dtypes()
+
+
+def reconcile(results):
+    """Compare each table's totals with the totals taken from the reports."""
+    rows = []
+    for check, truth, table, column in RECONCILIATION:
+        expected = results[truth]
+        actual = len(results[table]) if column is None else results[table][column].sum()
+        rows.append({
+            "Check": check,
+            "Reports": expected,
+            "Table": actual,
+            "Difference": actual - expected,
+            "OK": bool(actual == expected),
+        })
+    return pd.DataFrame(rows)
+
+
+def validate(frames, results):
+    """Data-quality tables for a build_tables() result set."""
+    return {
+        "input_quality": input_quality(frames, results),
+        "reconciliation": reconcile(results),
+    }
@@ -0,0 +1,94 @@
+import math
+
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = [50, 100, 250, 500, 1000]
+
+
+# =============================
+# SERVER-SIDE FILTER / SORT / PAGE
+# =============================
+
+def filter_frame(df, selections=None, search="", search_columns=()):
+    """Rows matching every column selection and containing ``search``
+    (case-insensitive) in any of ``search_columns``."""
+    mask = pd.Series(True, index=df.index)
+    for column, values in (selections or {}).items():
+        if values:
+            mask &= df[column].isin(values)
+    search = search.strip()
+    if search:
+        hit = pd.Series(False, index=df.index)
+        for column in search_columns:
+            hit |= df[column].astype(str).str.contains(search, case=False, regex=False, na=False)
+        mask &= hit
+    return df if mask.all() else df[mask]
+
+
+def sort_frame(df, column=None, ascending=True):
+    if not column:
+        return df
+    return df.sort_values(column, ascending=ascending, na_position="last", kind="stable")
+
+
+def page_bounds(total_rows, page, page_size):
+    pages = max(1, math.ceil(total_rows / page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total_rows), pages
+
+
+def _options(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        values = series.cat.categories
+    else:
+        values = series.dropna().unique()
+    return sorted(values, key=str)
+
+
+# =============================
+# STREAMLIT WIDGET
+# =============================
+
+def paged_table(df, key, filter_columns=("Brand", "Brand Manager"), search_columns=("EasycomSKU",), height=600):
+    """Show ``df`` one page at a time; filtering, search and sorting happen on
+    the server so only the visible rows are sent to the browser.
+
+    Returns the filtered + sorted frame.
+    """
+    filter_columns = [c for c in filter_columns if c in df.columns]
+    search_columns = [c for c in search_columns if c in df.columns]
+
+    cols = st.columns(len(filter_columns) + 1)
+    selections = {}
+    for col, column in zip(cols, filter_columns):
+        with col:
+            selections[column] = st.multiselect(column, _options(df[column]), key=f"{key}_filter_{column}")
+    with cols[-1]:
+        search = st.text_input(f"Search {', '.join(search_columns)}", key=f"{key}_search")
+
+    col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+    with col1:
+        sort_by = st.selectbox("Sort by", [""] + list(df.columns), key=f"{key}_sort")
+    with col2:
+        ascending = st.checkbox("Ascending", value=False, key=f"{key}_asc")
+    with col3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    view = sort_frame(filter_frame(df, selections, search, search_columns), sort_by, ascending)
+
+    pages = max(1, math.ceil(len(view) / page_size))
+    # Filters can shrink the result below the page the user was on
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with col4:
+        page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, key=f"{key}_page")
+    start, end, _ = page_bounds(len(view), int(page), page_size)
+
+    st.dataframe(view.iloc[start:end], use_container_width=True, height=height)
+    if len(view) == len(df):
+        st.caption(f"Rows {start + 1 if end else 0:,}–{end:,} of {len(view):,}")
+    else:
+        st.caption(f"Rows {start + 1 if end else 0:,}–{end:,} of {len(view):,} (filtered from {len(df):,})")
+    return view